@@ -0,0 +1,162 @@
+import asyncio
+import json
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+
+def diff_rows(before: Optional[dict], after: Optional[dict]) -> dict:
+    """{field: [old, new]} for every field that changed"""
+    before = before or {}
+    after = after or {}
+    return {
+        k: [before.get(k), after.get(k)]
+        for k in dict.fromkeys([*before, *after])
+        if k not in ("id", "wedding_id", "created_at") and before.get(k) != after.get(k)
+    }
+
+
+# Cleared if the database predates the update_returning_old function
+_update_rpc_available = True
+
+
+def update_returning_old(client, table: str, row_id: str, updates: dict) -> tuple[Optional[dict], Optional[dict]]:
+    """Update a row and return (before, after), or (None, None) if it doesn't
+    exist. Uses the update_returning_old database function so capturing the
+    before-image costs no extra round trip; falls back to reading the row
+    first on databases that haven't run supabase_add_audit_log.sql."""
+    global _update_rpc_available
+    if _update_rpc_available:
+        try:
+            result = client.rpc(
+                "update_returning_old", {"tbl": table, "row_id": row_id, "changes": updates}
+            ).execute().data
+        except Exception as e:
+            # PGRST202: PostgREST couldn't find the function
+            if getattr(e, "code", None) != "PGRST202":
+                raise
+            print("[WARNING] update_returning_old is missing; run supabase_add_audit_log.sql")
+            _update_rpc_available = False
+        else:
+            return (result["before"], result["after"]) if result else (None, None)
+
+    existing = client.table(table).select("*").eq("id", row_id).execute()
+    if not existing.data:
+        return None, None
+    result = client.table(table).update(updates).eq("id", row_id).execute()
+    return existing.data[0], result.data[0] if result.data else None
+
+
+class AuditLog:
+    """Buffers audit entries in memory and writes them to audit_log in
+    batches from a background task, so mutations don't wait on the insert.
+
+    The buffer is bounded: when it fills up, the producer triggers a flush
+    itself, and only if that fails (database down) is the oldest entry
+    dropped to keep requests from stalling.
+    """
+
+    def __init__(self, client, capacity: int = 10000, batch_size: int = 500, flush_interval: float = 1.0):
+        self.client = client
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer: deque[dict] = deque()
+        self.metrics = {"recorded": 0, "written": 0, "batches": 0, "failed_batches": 0, "dropped": 0}
+        self._lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @property
+    def wakeup(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    async def record(self, table: str, action: str, before: Optional[dict], after: Optional[dict],
+                     actor_id: Optional[str] = None):
+        row = after or before
+        changes = diff_rows(before, after)
+        if action == "update" and not changes:
+            return
+        if len(self.buffer) >= self.capacity:
+            await self.flush()
+            if len(self.buffer) >= self.capacity:
+                self.buffer.popleft()
+                self.metrics["dropped"] += 1
+        self.buffer.append({
+            "id": str(uuid.uuid4()),
+            "wedding_id": row["id"] if table == "weddings" else row.get("wedding_id"),
+            "table_name": table,
+            "row_id": row["id"],
+            "action": action,
+            "actor_id": actor_id,
+            "changes": changes,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+        self.metrics["recorded"] += 1
+        if len(self.buffer) >= self.batch_size:
+            self.wakeup.set()
+
+    async def flush(self) -> bool:
+        """Write everything buffered; False if a batch failed and was requeued"""
+        async with self.lock:
+            while self.buffer:
+                batch = [self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))]
+                try:
+                    await run_in_threadpool(lambda: self.client.table("audit_log").insert(batch).execute())
+                except Exception as e:
+                    print(f"[ERROR] audit flush: {str(e)}")
+                    self.metrics["failed_batches"] += 1
+                    self.buffer.extendleft(reversed(batch))
+                    return False
+                self.metrics["batches"] += 1
+                self.metrics["written"] += len(batch)
+        return True
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            # Bind to the running loop in case the app is restarted on a new one
+            self._lock = self._wakeup = None
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Let the task finish its current flush rather than cancelling it
+            # with a batch popped off the buffer
+            self._stopping = True
+            self.wakeup.set()
+            await self._task
+            self._task = None
+        if not await self.flush():
+            print(f"[WARNING] audit: dropping {len(self.buffer)} unflushed entries on shutdown")
+
+    def stats(self) -> dict:
+        return {**self.metrics, "buffered": len(self.buffer), "capacity": self.capacity}
+
+
+def decode_changes(entry: dict) -> dict:
+    # jsonb comes back decoded from Supabase but as text from SQLite
+    if isinstance(entry.get("changes"), str):
+        entry["changes"] = json.loads(entry["changes"])
+    return entry
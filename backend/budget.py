@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from .portfolio import fetch_all
+from .timeline import parse_timestamp
+
+
+def _safe_timestamp(value) -> Optional[datetime]:
+    try:
+        return parse_timestamp(value)
+    except ValueError:
+        return None
+
+
+def compute_budget_analytics(items: list[dict], total_budget: int, wedding_date=None,
+                             now: Optional[datetime] = None) -> dict:
+    """Roll up budget line items column-wise instead of looping per row"""
+    import numpy as np  # deferred so it doesn't slow down cold starts
+
+    now = now or datetime.now(timezone.utc)
+    total_budget = total_budget or 0
+
+    categories = np.array([i.get("category") or "" for i in items], dtype=object)
+    planned = np.fromiter((i.get("planned") or 0 for i in items), dtype=np.int64, count=len(items))
+    actual = np.fromiter((i.get("actual") or 0 for i in items), dtype=np.int64, count=len(items))
+
+    names, codes = np.unique(categories, return_inverse=True)
+    cat_planned = np.bincount(codes, weights=planned, minlength=len(names)).astype(np.int64)
+    cat_actual = np.bincount(codes, weights=actual, minlength=len(names)).astype(np.int64)
+    cat_count = np.bincount(codes, minlength=len(names))
+    cat_variance = cat_actual - cat_planned
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cat_variance_pct = np.where(cat_planned > 0, cat_variance / cat_planned * 100, 0.0)
+
+    total_planned = int(planned.sum())
+    total_spent = int(actual.sum())
+    # An item is committed to at least its plan even before money is spent
+    committed = int(np.maximum(planned, actual).sum())
+
+    by_category = [
+        {
+            "category": str(names[i]),
+            "items": int(cat_count[i]),
+            "planned": int(cat_planned[i]),
+            "actual": int(cat_actual[i]),
+            "variance": int(cat_variance[i]),
+            "variance_pct": round(float(cat_variance_pct[i]), 2),
+            "over_budget": bool(cat_variance[i] > 0),
+        }
+        for i in np.argsort(-cat_actual, kind="stable")
+    ]
+
+    # Burn rate: actual spend spread over the time since the first line item.
+    # created_at values all come back from Postgres in the same ISO format, so
+    # the earliest one is also the smallest string.
+    first_created = _safe_timestamp(min((i["created_at"] for i in items if i.get("created_at")), default=None))
+    wedding_at = _safe_timestamp(wedding_date)
+    daily_burn = None
+    run_rate_spend = None
+    if first_created and total_spent:
+        days_elapsed = max((now - first_created).total_seconds() / 86400, 1.0)
+        daily_burn = total_spent / days_elapsed
+        if wedding_at and wedding_at > now:
+            days_left = (wedding_at - now).total_seconds() / 86400
+            run_rate_spend = int(total_spent + daily_burn * days_left)
+
+    return {
+        "total_budget": total_budget,
+        "total_planned": total_planned,
+        "total_spent": total_spent,
+        "remaining": total_budget - total_spent,
+        "percent_used": round(total_spent / total_budget * 100, 2) if total_budget else None,
+        "unallocated": total_budget - total_planned,
+        "by_category": by_category,
+        "projection": {
+            "committed": committed,
+            "daily_burn": round(daily_burn, 2) if daily_burn is not None else None,
+            "run_rate_spend": run_rate_spend,
+            "projected_overrun": max(committed - total_budget, 0),
+        },
+    }
+
+
+# wedding_id -> (computed_at, analytics), dropped whenever one of the wedding's
+# budget items or its total_budget changes. The projection depends on the
+# current time, so entries also expire after the TTL; least recently used
+# entries are dropped past BUDGET_ANALYTICS_CACHE_SIZE.
+BUDGET_ANALYTICS_CACHE_SIZE = 256
+BUDGET_ANALYTICS_CACHE_TTL = 300  # seconds
+budget_analytics_cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+
+def get_budget_analytics(client, wedding_id: str, overlay: Optional[Callable[[str, list[dict]], list[dict]]] = None) -> Optional[dict]:
+    """overlay applies edits acknowledged but not yet written (write-behind)"""
+    cached = budget_analytics_cache.get(wedding_id)
+    if cached and time.monotonic() - cached[0] < BUDGET_ANALYTICS_CACHE_TTL:
+        budget_analytics_cache.move_to_end(wedding_id)
+        return cached[1]
+    wedding = client.table("weddings").select("total_budget, date").eq("id", wedding_id).execute()
+    if not wedding.data:
+        budget_analytics_cache.pop(wedding_id, None)
+        return None
+    items = fetch_all(
+        lambda: client.table("budget_items").select("id, category, planned, actual, created_at").eq("wedding_id", wedding_id).order("id")
+    )
+    if overlay:
+        items = overlay("budget_items", items)
+    analytics = compute_budget_analytics(items, wedding.data[0].get("total_budget"), wedding.data[0].get("date"))
+    budget_analytics_cache[wedding_id] = (time.monotonic(), analytics)
+    budget_analytics_cache.move_to_end(wedding_id)
+    while len(budget_analytics_cache) > BUDGET_ANALYTICS_CACHE_SIZE:
+        budget_analytics_cache.popitem(last=False)
+    return analytics
+
+
+def invalidate_budget_analytics(wedding_id: Optional[str]):
+    budget_analytics_cache.pop(wedding_id, None)
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+from pydantic import ValidationError
+
+from .models import (
+    WeddingBase, TeamMemberCreate, GuestCreate, TimelineEventCreate, TaskCreate, BudgetItemCreate,
+)
+
+BUNDLE_FORMAT = "swift-shaadi-bundle"
+BUNDLE_VERSION = 1
+EXPORT_PAGE_SIZE = 1000
+IMPORT_BATCH_SIZE = 500
+
+# Parents first, so a bundle can be applied top to bottom
+BUNDLE_TABLES = ("weddings", "wedding_team_members", "timeline_events", "tasks", "guests", "budget_items")
+
+# The writable columns of each table, used to validate and normalize imported rows
+ROW_MODELS = {
+    "weddings": WeddingBase,
+    "wedding_team_members": TeamMemberCreate,
+    "timeline_events": TimelineEventCreate,
+    "tasks": TaskCreate,
+    "guests": GuestCreate,
+    "budget_items": BudgetItemCreate,
+}
+
+
+def row_version(row: dict) -> str:
+    """Content fingerprint of a row; offline edits send back the version they
+    started from so concurrent online changes can be detected"""
+    canonical = json.dumps(row, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def iter_rows(client, table: str, wedding_id: str, page_size: int = EXPORT_PAGE_SIZE) -> Iterator[list[dict]]:
+    """Yield a wedding's rows from one table a page at a time, keyed on id"""
+    column = "id" if table == "weddings" else "wedding_id"
+    last_id = None
+    while True:
+        query = client.table(table).select("*").eq(column, wedding_id)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = query.order("id").limit(page_size).execute().data
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last_id = page[-1]["id"]
+
+
+def iter_bundle_lines(client, wedding_id: str) -> Iterator[bytes]:
+    """The bundle as NDJSON: a header, then per table a column list followed
+    by one array per row (with its version last), then the row counts"""
+    def line(value) -> bytes:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode() + b"\n"
+
+    yield line({
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_VERSION,
+        "wedding_id": wedding_id,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "tables": list(BUNDLE_TABLES),
+    })
+    counts = {}
+    for table in BUNDLE_TABLES:
+        counts[table] = 0
+        columns = None
+        for page in iter_rows(client, table, wedding_id):
+            if columns is None:
+                columns = list(page[0])
+                yield line({"table": table, "columns": [*columns, "_version"]})
+            for row in page:
+                yield line([*(row.get(c) for c in columns), row_version(row)])
+            counts[table] += len(page)
+        if columns is None:
+            yield line({"table": table, "columns": []})
+    yield line({"counts": counts})
+
+
+def export_bundle(client, wedding_id: str, level: int = 6) -> Iterator[bytes]:
+    """Gzip the bundle as it is generated so the whole wedding is never held
+    in memory"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in iter_bundle_lines(client, wedding_id):
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _prepare(table: str, wedding_id: str, row: dict, current: Optional[dict]) -> dict:
+    """Validate an imported row against its model and pin it to the wedding"""
+    merged = {**(current or {}), **row}
+    prepared = ROW_MODELS[table].model_validate(merged).model_dump()
+    prepared["id"] = row["id"]
+    if table == "weddings":
+        prepared["owner_id"] = current["owner_id"]
+    else:
+        prepared["wedding_id"] = wedding_id
+    return prepared
+
+
+def _valid_id(value) -> bool:
+    # Postgres rejects the whole batched read if any id isn't a UUID
+    try:
+        return isinstance(value, str) and str(uuid.UUID(value)) == value.lower()
+    except ValueError:
+        return False
+
+
+def _conflict(table: str, row_id, reason: str, current: Optional[dict] = None, detail: Optional[str] = None) -> dict:
+    conflict = {"table": table, "id": row_id, "reason": reason}
+    if current is not None:
+        conflict["current"] = current
+        conflict["current_version"] = row_version(current)
+    if detail:
+        conflict["detail"] = detail
+    return conflict
+
+
+def merge_import(client, wedding_id: str, changes: list[dict], batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """Apply offline edits, skipping any row changed online since it was exported.
+
+    Each change is {table, op: "upsert" | "delete", row, base_version}, where
+    base_version is the row's version from the bundle (None for rows created
+    offline). Rows that can't be applied come back as conflicts together with
+    the current row; the rest are written with one batched read, upsert and
+    delete per table.
+    """
+    applied, conflicts, failed = [], [], []
+    for table in BUNDLE_TABLES:
+        table_changes = [c for c in changes if c["table"] == table]
+        if not table_changes:
+            continue
+        ids = list(dict.fromkeys(c["row"]["id"] for c in table_changes if _valid_id(c["row"].get("id"))))
+        current = {}
+        for start in range(0, len(ids), batch_size):
+            rows = client.table(table).select("*").in_("id", ids[start:start + batch_size]).execute().data
+            current.update((row["id"], row) for row in rows)
+
+        upserts, deletes = {}, {}
+        for change in table_changes:
+            row_id = change["row"].get("id")
+            # Checked before the lookup: a list or object id isn't hashable
+            if not _valid_id(row_id):
+                conflicts.append(_conflict(table, row_id, "invalid", detail="Row id must be a UUID"))
+                continue
+            before = current.get(row_id)
+            owner = before and (before["id"] if table == "weddings" else before.get("wedding_id"))
+            if (table == "weddings" and row_id != wedding_id) or (before and owner != wedding_id):
+                conflicts.append(_conflict(table, row_id, "invalid", detail="Row belongs to another wedding"))
+                continue
+
+            if change["op"] == "delete":
+                if before is None:
+                    continue  # already gone
+                if table == "weddings":
+                    conflicts.append(_conflict(table, row_id, "invalid", detail="Weddings can't be deleted by import"))
+                elif change.get("base_version") != row_version(before):
+                    conflicts.append(_conflict(table, row_id, "modified", before))
+                else:
+                    deletes[row_id] = before
+                    current.pop(row_id)
+                continue
+
+            if before is None and (change.get("base_version") or table == "weddings"):
+                conflicts.append(_conflict(table, row_id, "deleted"))
+                continue
+            try:
+                prepared = _prepare(table, wedding_id, change["row"], before)
+            except ValidationError as e:
+                conflicts.append(_conflict(table, row_id, "invalid", detail=str(e)))
+                continue
+            if before is not None and all(before.get(k) == v for k, v in prepared.items()):
+                continue  # already applied, e.g. a retried import
+            if before is not None and change.get("base_version") is None:
+                conflicts.append(_conflict(table, row_id, "exists", before))
+                continue
+            if before is not None and change["base_version"] != row_version(before):
+                conflicts.append(_conflict(table, row_id, "modified", before))
+                continue
+            upserts[row_id] = (before, prepared)
+            current[row_id] = {**(before or {}), **prepared}
+
+        pending = list(upserts.values())
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                written = client.table(table).upsert([row for _, row in batch]).execute().data
+            except Exception as e:
+                failed.extend({"table": table, "id": row["id"], "error": str(e)} for _, row in batch)
+                continue
+            befores = {row["id"]: before for before, row in batch}
+            applied.extend(
+                {"table": table, "action": "update" if befores[row["id"]] else "insert",
+                 "before": befores[row["id"]], "after": row}
+                for row in written
+            )
+
+        pending_ids = list(deletes)
+        for start in range(0, len(pending_ids), batch_size):
+            batch = pending_ids[start:start + batch_size]
+            try:
+                removed = client.table(table).delete().in_("id", batch).eq("wedding_id", wedding_id).execute().data
+            except Exception as e:
+                failed.extend({"table": table, "id": row_id, "error": str(e)} for row_id in batch)
+                continue
+            applied.extend({"table": table, "action": "delete", "before": row, "after": None} for row in removed)
+
+    return {"applied": applied, "conflicts": conflicts, "failed": failed}
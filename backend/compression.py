@@ -0,0 +1,155 @@
+import gzip
+import json
+from typing import Optional
+from urllib.parse import parse_qs
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+from .models import Wedding, TeamMember, Guest, TimelineEvent, Task, BudgetItem
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+
+def _collect_field_defaults() -> dict:
+    defaults = {}
+    for model in (Wedding, TeamMember, Guest, TimelineEvent, Task, BudgetItem):
+        for name, field in model.model_fields.items():
+            if not field.is_required() and field.default is not None:
+                defaults[name] = field.default
+    return defaults
+
+
+# Field name -> model default, e.g. rsvp_status -> "invited", planned -> 0
+FIELD_DEFAULTS = _collect_field_defaults()
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q-values"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token.lower()] = q
+    candidates = (["br"] if brotli else []) + ["gzip"]
+    best = max(candidates, key=lambda e: accepted.get(e, accepted.get("*", 0)))
+    return best if accepted.get(best, accepted.get("*", 0)) > 0 else None
+
+
+def omit_nulls(value):
+    if isinstance(value, list):
+        return [omit_nulls(v) for v in value]
+    if isinstance(value, dict):
+        return {k: omit_nulls(v) for k, v in value.items() if v is not None}
+    return value
+
+
+def omit_empty(value):
+    """Drop null fields, and fields still at their model default from the
+    rows a list endpoint returns. Defaults are only dropped there: other
+    payloads (stats, analytics) aren't model rows, so a 0 in them is data."""
+    if isinstance(value, list):
+        return [_omit_row(row) if isinstance(row, dict) else omit_nulls(row) for row in value]
+    return omit_nulls(value)
+
+
+def _omit_row(row: dict) -> dict:
+    return {
+        k: omit_nulls(v) for k, v in row.items()
+        if v is not None and not (k in FIELD_DEFAULTS and FIELD_DEFAULTS[k] == v)
+    }
+
+
+def to_columnar(value):
+    """Encode a list of row objects as {"columns": [...], "rows": [[...]]}"""
+    if not isinstance(value, list) or not all(isinstance(r, dict) for r in value):
+        return value
+    columns = list(dict.fromkeys(k for row in value for k in row))
+    return {"columns": columns, "rows": [[row.get(c) for c in columns] for row in value]}
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class PayloadMiddleware:
+    """Shrinks JSON responses: optional null/default omission (?omit=empty),
+    columnar list encoding (?format=columnar) and negotiated br/gzip
+    compression. Bodies above offload_size are compressed in a worker thread
+    so they don't block the event loop."""
+
+    def __init__(self, app, minimum_size: int = 1024, offload_size: int = 64 * 1024, level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.level = level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query = parse_qs(scope.get("query_string", b"").decode())
+        omit = "empty" in query.get("omit", [])
+        columnar = "columnar" in query.get("format", [])
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if not (omit or columnar or encoding):
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        chunks: list[bytes] = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers or not headers.get("content-type", "").startswith("application/json"):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self.finish(send, start_message, b"".join(chunks), omit, columnar, encoding)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def finish(self, send, start_message, body: bytes, omit: bool, columnar: bool, encoding: Optional[str]):
+        headers = MutableHeaders(raw=start_message["headers"])
+        if (omit or columnar) and body:
+            payload = json.loads(body)
+            if omit:
+                payload = omit_empty(payload)
+            if columnar:
+                payload = to_columnar(payload)
+            body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+
+        if encoding and len(body) >= self.minimum_size:
+            if len(body) >= self.offload_size:
+                body = await anyio.to_thread.run_sync(compress, body, encoding, self.level)
+            else:
+                body = compress(body, encoding, self.level)
+            headers["Content-Encoding"] = encoding
+        headers.add_vary_header("Accept-Encoding")
+
+        headers["Content-Length"] = str(len(body))
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body})
@@ -1,13 +1,49 @@
 import os
-from supabase import create_client, Client
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# "supabase" (default) or "sqlite" for self-hosting, tests and benchmarks
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "supabase").lower()
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "swift_shaadi.db")
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "4"))
+
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_ANON_KEY")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("Missing SUPABASE_URL or SUPABASE_ANON_KEY environment variables")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+def create_storage_client(backend: str = STORAGE_BACKEND):
+    """Build the client for the configured storage engine. Both expose the
+    Supabase client's table() query-builder API."""
+    if backend == "sqlite":
+        from .sqlite_engine import SQLiteClient
+        return SQLiteClient(SQLITE_PATH, pool_size=SQLITE_POOL_SIZE)
+
+    if backend != "supabase":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError("Missing SUPABASE_URL or SUPABASE_ANON_KEY environment variables")
+
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+
+_client = None
+
+
+def get_db():
+    global _client
+    if _client is None:
+        _client = create_storage_client()
+    return _client
+
+
+class _LazyClient:
+    """Stands in for the storage client so importing the app doesn't connect;
+    the real client is built on first use (normally during startup)"""
+
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
+
+
+db = _LazyClient()
@@ -1,17 +1,27 @@
-from fastapi import FastAPI, HTTPException, Depends, Response, Cookie, Request
+from . import startup  # first, so the import timing covers everything below
+from fastapi import FastAPI, HTTPException, Depends, Response, Cookie, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
 from typing import Optional
 import uuid
 import hashlib
 import os
 import traceback
 import secrets
-import httpx
+from contextlib import asynccontextmanager
 from urllib.parse import urlencode
-from dotenv import load_dotenv
-
-from .database import supabase
+from starlette.concurrency import run_in_threadpool
+
+from .database import db, get_db
+from .compression import PayloadMiddleware
+from .rate_limit import RateLimitMiddleware, SQLiteCounterStore
+from .budget import get_budget_analytics, invalidate_budget_analytics
+from .portfolio import compute_wedding_stats, get_portfolio, invalidate_portfolio, invalidate_wedding_portfolio
+from .timeline import get_schedule_index, index_event, index_task
+from .write_behind import WriteBehindBuffer
+from .audit import AuditLog, decode_changes, update_returning_old
+from .bundle import BUNDLE_VERSION, export_bundle, merge_import, row_version
+from .notifications import NotificationDispatcher, transports_from_env
 from .models import (
     UserCreate, UserLogin, User,
     WeddingCreate, WeddingUpdate, Wedding,
@@ -20,12 +30,11 @@ from .models import (
     TimelineEventCreate, TimelineEventUpdate, TimelineEvent,
     TaskCreate, TaskUpdate, Task,
     BudgetItemCreate, BudgetItemUpdate, BudgetItem,
+    NotificationCreate,
+    BundleImport,
 )
 
 
-load_dotenv()
-
-
 # Google OAuth Configuration
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET", "")
@@ -118,7 +127,56 @@ def verify_signed_state(state: str, initiator_cookie: str) -> bool:
     except Exception:
         return False
 
-app = FastAPI(title="Swift Shaadi API", version="1.0.0")
+# Shared HTTP client for Google OAuth calls, created during startup
+http_client = None
+READINESS_RECHECK_INTERVAL = 5  # seconds between retries while not ready
+READY_RECHECK_INTERVAL = 30  # seconds a successful check is trusted for
+
+
+async def warm_up():
+    """Build the storage client and open its first connection"""
+    try:
+        with startup.phase("storage_client"):
+            client = await run_in_threadpool(get_db)
+        with startup.phase("storage_warm_up"):
+            await run_in_threadpool(lambda: client.table("users").select("id").limit(1).execute())
+        startup.readiness.update(ready=True, error=None)
+    except Exception as e:
+        log_error("warm_up", e)
+        startup.readiness.update(ready=False, error=str(e))
+    startup.readiness["checked_at"] = time.monotonic()
+
+
+async def check_storage():
+    """Re-run the warm-up query without touching the startup timings"""
+    # Claim the check first so concurrent probes don't all query
+    startup.readiness["checked_at"] = time.monotonic()
+    try:
+        client = await run_in_threadpool(get_db)
+        await run_in_threadpool(lambda: client.table("users").select("id").limit(1).execute())
+        startup.readiness.update(ready=True, error=None)
+    except Exception as e:
+        log_error("readiness", e)
+        startup.readiness.update(ready=False, error=str(e))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client
+    import httpx
+
+    with startup.phase("http_client"):
+        http_client = httpx.AsyncClient(timeout=10)
+    await warm_up()
+    write_behind.start()
+    audit_log.start()
+    yield
+    await write_behind.stop()
+    await audit_log.stop()
+    await http_client.aclose()
+
+
+app = FastAPI(title="Swift Shaadi API", version="1.0.0", lifespan=lifespan)
 
 # Log errors for debugging
 def log_error(context: str, error: Exception):
@@ -130,6 +188,29 @@ allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 if allowed_origins == ["*"]:
     allowed_origins = ["*"]
 
+# Compress and optionally compact JSON responses for mobile clients
+app.add_middleware(
+    PayloadMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+)
+
+# Per-IP/session token buckets plus a global in-flight cap. Point
+# RATE_LIMIT_STORE_PATH at a shared file when running several workers.
+# TRUSTED_PROXY_HOPS is the number of proxies in front of FastAPI that append
+# to X-Forwarded-For (1 = the Node server alone; 2 on Render, whose load
+# balancer sits in front of it; 0 = ignore the header).
+if os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false":
+    rate_limit_store_path = os.getenv("RATE_LIMIT_STORE_PATH")
+    app.add_middleware(
+        RateLimitMiddleware,
+        store=SQLiteCounterStore(rate_limit_store_path) if rate_limit_store_path else None,
+        rate=float(os.getenv("RATE_LIMIT_PER_SECOND", "10")),
+        burst=int(os.getenv("RATE_LIMIT_BURST", "40")),
+        max_concurrent=int(os.getenv("MAX_CONCURRENT_REQUESTS", "32")),
+        max_queue=int(os.getenv("MAX_QUEUED_REQUESTS", "64")),
+        trusted_hops=int(os.getenv("TRUSTED_PROXY_HOPS", "1")),
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -140,6 +221,56 @@ app.add_middleware(
 
 sessions: dict[str, str] = {}
 
+# Optional write-behind for PATCH bursts (disabled unless a window is set).
+# Best-effort: acknowledged edits can be lost if the process dies before a flush.
+write_behind = WriteBehindBuffer(db, window=float(os.getenv("WRITE_BEHIND_WINDOW_MS", "0")) / 1000)
+
+
+def on_write_behind_flush(table: str, row: dict):
+    if table == "tasks":
+        index_task(row)
+    elif table == "budget_items":
+        invalidate_budget_analytics(row["wedding_id"])
+
+
+write_behind.listeners.append(on_write_behind_flush)
+
+
+# Change history for the mutation routes, written to audit_log in batches
+audit_log = AuditLog(db, capacity=int(os.getenv("AUDIT_BUFFER_SIZE", "10000")))
+
+# Guest invites and reminders, sent from background jobs
+notifications = NotificationDispatcher(
+    db, transports_from_env(), concurrency=int(os.getenv("NOTIFY_CONCURRENCY", "8"))
+)
+
+# Tables whose PATCH bursts the write-behind buffer may coalesce
+WRITE_BEHIND_TABLES = {"guests", "tasks", "budget_items"}
+
+
+async def apply_update(table: str, row_id: str, update_data: dict, actor_id: Optional[str] = None) -> Optional[dict]:
+    """Apply and audit an update, coalescing it into a pending write-behind
+    entry where possible"""
+    coalesce = table in WRITE_BEHIND_TABLES
+    before = write_behind.peek(table, row_id) if coalesce else None
+    row = write_behind.merge(table, row_id, update_data) if coalesce else None
+    if row is None:
+        before, row = update_returning_old(db, table, row_id, update_data)
+        if row is None:
+            return None
+        if coalesce:
+            write_behind.track(table, row)
+    await audit_log.record(table, "update", before, row, actor_id)
+    return row
+
+
+async def apply_delete(table: str, row_id: str, actor_id: Optional[str] = None) -> list[dict]:
+    write_behind.discard(table, row_id)
+    result = db.table(table).delete().eq("id", row_id).execute()
+    for row in result.data:
+        await audit_log.record(table, "delete", row, None, actor_id)
+    return result.data
+
 
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
@@ -151,22 +282,64 @@ def get_current_user(session_id: Optional[str] = Cookie(None, alias="session_id"
     return sessions[session_id]
 
 
-# Health check endpoint
+def get_optional_user(session_id: Optional[str] = Cookie(None, alias="session_id")) -> Optional[str]:
+    return sessions.get(session_id) if session_id else None
+
+
+def get_accessible_wedding(wedding_id: str, user_id: str, columns: str = "id, owner_id") -> dict:
+    """The wedding if the user owns it or is on its team; 404 otherwise, so
+    other users' weddings can't be probed"""
+    wedding = db.table("weddings").select(columns).eq("id", wedding_id).execute()
+    if wedding.data:
+        if wedding.data[0]["owner_id"] == user_id:
+            return wedding.data[0]
+        member = db.table("wedding_team_members").select("id").eq("wedding_id", wedding_id).eq("user_id", user_id).execute()
+        if member.data:
+            return wedding.data[0]
+    raise HTTPException(status_code=404, detail="Wedding not found")
+
+
+# Health checks: liveness never touches the database; readiness reports the
+# result of the last storage check, re-running it every few seconds while not
+# ready and every READY_RECHECK_INTERVAL while ready
+@app.get("/api/health/live")
+async def liveness():
+    return {"status": "ok"}
+
+
+@app.get("/api/health/ready")
 @app.get("/api/health")
-async def health_check():
-    try:
-        result = supabase.table("users").select("id").limit(1).execute()
-        return {"status": "ok", "database": "connected"}
-    except Exception as e:
-        log_error("health_check", e)
-        return {"status": "error", "database": "disconnected", "message": str(e)}
+async def readiness(response: Response):
+    state = startup.readiness
+    interval = READY_RECHECK_INTERVAL if state["ready"] else READINESS_RECHECK_INTERVAL
+    if time.monotonic() - state["checked_at"] > interval:
+        await check_storage()
+    if not state["ready"]:
+        response.status_code = 503
+        return {"status": "error", "database": "disconnected", "message": state["error"]}
+    return {"status": "ok", "database": "connected"}
+
+
+@app.get("/api/health/startup")
+async def startup_report():
+    return startup.report()
+
+
+@app.get("/api/metrics/write-behind")
+async def write_behind_metrics():
+    return write_behind.stats()
+
+
+@app.get("/api/metrics/audit")
+async def audit_metrics():
+    return audit_log.stats()
 
 
 # Auth Routes
 @app.post("/api/auth/signup")
 async def signup(user: UserCreate, request: Request, response: Response):
     try:
-        existing = supabase.table("users").select("id").eq("email", user.email).execute()
+        existing = db.table("users").select("id").eq("email", user.email).execute()
         if existing.data:
             raise HTTPException(status_code=400, detail="Email already registered")
         
@@ -178,7 +351,7 @@ async def signup(user: UserCreate, request: Request, response: Response):
             "password": hash_password(user.password),
         }
         
-        result = supabase.table("users").insert(new_user).execute()
+        result = db.table("users").insert(new_user).execute()
         
         if not result.data:
             raise HTTPException(status_code=500, detail="Failed to create user")
@@ -201,7 +374,7 @@ async def signup(user: UserCreate, request: Request, response: Response):
 
 @app.post("/api/auth/login")
 async def login(credentials: UserLogin, request: Request, response: Response):
-    result = supabase.table("users").select("*").eq("email", credentials.email).execute()
+    result = db.table("users").select("*").eq("email", credentials.email).execute()
     
     if not result.data:
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -231,7 +404,7 @@ async def logout(response: Response, session_id: Optional[str] = Cookie(None, al
 
 @app.get("/api/auth/me")
 async def get_me(user_id: str = Depends(get_current_user)):
-    result = supabase.table("users").select("id, name, email").eq("id", user_id).execute()
+    result = db.table("users").select("id, name, email").eq("id", user_id).execute()
     if not result.data:
         raise HTTPException(status_code=404, detail="User not found")
     return {"user": result.data[0]}
@@ -338,84 +511,84 @@ async def google_callback(
     
     try:
         # Exchange code for tokens
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                "https://oauth2.googleapis.com/token",
-                data={
-                    "client_id": GOOGLE_CLIENT_ID,
-                    "client_secret": GOOGLE_CLIENT_SECRET,
-                    "code": code,
-                    "grant_type": "authorization_code",
-                    "redirect_uri": redirect_uri,
-                },
-            )
-            
-            if token_response.status_code != 200:
-                print(f"[ERROR] Token exchange failed: {token_response.text}")
-                return RedirectResponse(url="/app?error=token_exchange_failed")
-            
-            tokens = token_response.json()
-            access_token = tokens.get("access_token")
-            
-            # Get user info from Google
-            userinfo_response = await client.get(
-                "https://www.googleapis.com/oauth2/v2/userinfo",
-                headers={"Authorization": f"Bearer {access_token}"},
-            )
-            
-            if userinfo_response.status_code != 200:
-                print(f"[ERROR] User info failed: {userinfo_response.text}")
-                return RedirectResponse(url="/app?error=userinfo_failed")
-            
-            userinfo = userinfo_response.json()
-            email = userinfo.get("email")
-            name = userinfo.get("name", email.split("@")[0] if email else "User")
-            google_id = userinfo.get("id")
-            
-            if not email:
-                return RedirectResponse(url="/app?error=no_email")
-            
-            # Check if user exists
-            existing = supabase.table("users").select("*").eq("email", email).execute()
-            
-            if existing.data:
-                user = existing.data[0]
-                user_id = user["id"]
-            else:
-                # Create new user
-                user_id = str(uuid.uuid4())
-                new_user = {
-                    "id": user_id,
-                    "name": name,
-                    "email": email,
-                    "password": hash_password(f"google_{google_id}_{secrets.token_hex(16)}"),
-                    "google_id": google_id,
-                }
-                result = supabase.table("users").insert(new_user).execute()
-                if not result.data:
-                    return RedirectResponse(url="/app?error=user_creation_failed")
-            
-            # Create session
-            session_id = str(uuid.uuid4())
-            sessions[session_id] = user_id
-            
-            # Redirect to app with session cookie
-            response = RedirectResponse(url="/app", status_code=302)
-            
-            # Set secure flag based on protocol
-            is_secure = scheme == "https"
-            response.set_cookie(
-                "session_id", 
-                session_id, 
-                httponly=True, 
-                samesite="lax",
-                secure=is_secure,
-                max_age=60 * 60 * 24 * 7,  # 7 days
-            )
-            # Delete the oauth_initiator cookie after successful use
-            response.delete_cookie("oauth_initiator")
-            return response
-            
+        client = http_client
+        token_response = await client.post(
+            "https://oauth2.googleapis.com/token",
+            data={
+                "client_id": GOOGLE_CLIENT_ID,
+                "client_secret": GOOGLE_CLIENT_SECRET,
+                "code": code,
+                "grant_type": "authorization_code",
+                "redirect_uri": redirect_uri,
+            },
+        )
+        
+        if token_response.status_code != 200:
+            print(f"[ERROR] Token exchange failed: {token_response.text}")
+            return RedirectResponse(url="/app?error=token_exchange_failed")
+        
+        tokens = token_response.json()
+        access_token = tokens.get("access_token")
+        
+        # Get user info from Google
+        userinfo_response = await client.get(
+            "https://www.googleapis.com/oauth2/v2/userinfo",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+        
+        if userinfo_response.status_code != 200:
+            print(f"[ERROR] User info failed: {userinfo_response.text}")
+            return RedirectResponse(url="/app?error=userinfo_failed")
+        
+        userinfo = userinfo_response.json()
+        email = userinfo.get("email")
+        name = userinfo.get("name", email.split("@")[0] if email else "User")
+        google_id = userinfo.get("id")
+        
+        if not email:
+            return RedirectResponse(url="/app?error=no_email")
+        
+        # Check if user exists
+        existing = db.table("users").select("*").eq("email", email).execute()
+        
+        if existing.data:
+            user = existing.data[0]
+            user_id = user["id"]
+        else:
+            # Create new user
+            user_id = str(uuid.uuid4())
+            new_user = {
+                "id": user_id,
+                "name": name,
+                "email": email,
+                "password": hash_password(f"google_{google_id}_{secrets.token_hex(16)}"),
+                "google_id": google_id,
+            }
+            result = db.table("users").insert(new_user).execute()
+            if not result.data:
+                return RedirectResponse(url="/app?error=user_creation_failed")
+        
+        # Create session
+        session_id = str(uuid.uuid4())
+        sessions[session_id] = user_id
+        
+        # Redirect to app with session cookie
+        response = RedirectResponse(url="/app", status_code=302)
+        
+        # Set secure flag based on protocol
+        is_secure = scheme == "https"
+        response.set_cookie(
+            "session_id", 
+            session_id, 
+            httponly=True, 
+            samesite="lax",
+            secure=is_secure,
+            max_age=60 * 60 * 24 * 7,  # 7 days
+        )
+        # Delete the oauth_initiator cookie after successful use
+        response.delete_cookie("oauth_initiator")
+        return response
+        
     except Exception as e:
         log_error("google_callback", e)
         return RedirectResponse(url="/app?error=oauth_error")
@@ -424,13 +597,23 @@ async def google_callback(
 # Wedding Routes
 @app.get("/api/weddings")
 async def get_weddings(user_id: str = Depends(get_current_user)):
-    result = supabase.table("weddings").select("*").eq("owner_id", user_id).execute()
+    result = db.table("weddings").select("*").eq("owner_id", user_id).execute()
     return result.data
 
 
+@app.get("/api/portfolio")
+async def get_weddings_portfolio(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    user_id: str = Depends(get_current_user),
+):
+    """All of the user's weddings with dashboard stats, ordered by date"""
+    return get_portfolio(db, user_id, page, page_size, overlay=write_behind.overlay)
+
+
 @app.get("/api/weddings/{wedding_id}")
 async def get_wedding(wedding_id: str):
-    result = supabase.table("weddings").select("*").eq("id", wedding_id).execute()
+    result = db.table("weddings").select("*").eq("id", wedding_id).execute()
     if not result.data:
         raise HTTPException(status_code=404, detail="Wedding not found")
     return result.data[0]
@@ -440,7 +623,7 @@ async def get_wedding(wedding_id: str):
 async def create_wedding(wedding: WeddingCreate, user_id: str = Depends(get_current_user)):
     wedding_id = str(uuid.uuid4())
     
-    user_result = supabase.table("users").select("name, email").eq("id", user_id).execute()
+    user_result = db.table("users").select("name, email").eq("id", user_id).execute()
     user_data = user_result.data[0] if user_result.data else {}
     
     new_wedding = {
@@ -455,7 +638,7 @@ async def create_wedding(wedding: WeddingCreate, user_id: str = Depends(get_curr
         "owner_id": user_id,
     }
     
-    result = supabase.table("weddings").insert(new_wedding).execute()
+    result = db.table("weddings").insert(new_wedding).execute()
     
     team_member = {
         "id": str(uuid.uuid4()),
@@ -465,28 +648,31 @@ async def create_wedding(wedding: WeddingCreate, user_id: str = Depends(get_curr
         "name": wedding.owner_name or user_data.get("name", "Owner"),
         "email": wedding.owner_email or user_data.get("email", ""),
     }
-    supabase.table("wedding_team_members").insert(team_member).execute()
+    db.table("wedding_team_members").insert(team_member).execute()
+    invalidate_portfolio(user_id)
     
     return result.data[0]
 
 
 @app.patch("/api/weddings/{wedding_id}")
-async def update_wedding(wedding_id: str, updates: WeddingUpdate):
+async def update_wedding(wedding_id: str, updates: WeddingUpdate, actor_id: Optional[str] = Depends(get_optional_user)):
     update_data = {k: v for k, v in updates.model_dump().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No updates provided")
     
-    result = supabase.table("weddings").update(update_data).eq("id", wedding_id).execute()
-    if not result.data:
+    row = await apply_update("weddings", wedding_id, update_data, actor_id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Wedding not found")
-    return result.data[0]
+    invalidate_budget_analytics(wedding_id)
+    invalidate_portfolio(row["owner_id"])
+    return row
 
 
 # Guest Routes
 @app.get("/api/weddings/{wedding_id}/guests")
 async def get_guests(wedding_id: str):
-    result = supabase.table("guests").select("*").eq("wedding_id", wedding_id).execute()
-    return result.data
+    result = db.table("guests").select("*").eq("wedding_id", wedding_id).execute()
+    return write_behind.overlay("guests", result.data)
 
 
 @app.post("/api/weddings/{wedding_id}/guests")
@@ -497,32 +683,35 @@ async def create_guest(wedding_id: str, guest: GuestCreate):
         "wedding_id": wedding_id,
         **guest.model_dump(),
     }
-    result = supabase.table("guests").insert(new_guest).execute()
+    result = db.table("guests").insert(new_guest).execute()
+    invalidate_wedding_portfolio(wedding_id)
     return result.data[0]
 
 
 @app.patch("/api/guests/{guest_id}")
-async def update_guest(guest_id: str, updates: GuestUpdate):
+async def update_guest(guest_id: str, updates: GuestUpdate, actor_id: Optional[str] = Depends(get_optional_user)):
     update_data = {k: v for k, v in updates.model_dump().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No updates provided")
     
-    result = supabase.table("guests").update(update_data).eq("id", guest_id).execute()
-    if not result.data:
+    row = await apply_update("guests", guest_id, update_data, actor_id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Guest not found")
-    return result.data[0]
+    invalidate_wedding_portfolio(row["wedding_id"])
+    return row
 
 
 @app.delete("/api/guests/{guest_id}")
-async def delete_guest(guest_id: str):
-    supabase.table("guests").delete().eq("id", guest_id).execute()
+async def delete_guest(guest_id: str, actor_id: Optional[str] = Depends(get_optional_user)):
+    for guest in await apply_delete("guests", guest_id, actor_id):
+        invalidate_wedding_portfolio(guest["wedding_id"])
     return {"success": True}
 
 
 # Timeline Event Routes
 @app.get("/api/weddings/{wedding_id}/events")
 async def get_events(wedding_id: str):
-    result = supabase.table("timeline_events").select("*").eq("wedding_id", wedding_id).execute()
+    result = db.table("timeline_events").select("*").eq("wedding_id", wedding_id).execute()
     return result.data
 
 
@@ -534,33 +723,36 @@ async def create_event(wedding_id: str, event: TimelineEventCreate):
         "wedding_id": wedding_id,
         **event.model_dump(),
     }
-    result = supabase.table("timeline_events").insert(new_event).execute()
+    result = db.table("timeline_events").insert(new_event).execute()
+    index_event(result.data[0])
     return result.data[0]
 
 
 @app.patch("/api/events/{event_id}")
-async def update_event(event_id: str, updates: TimelineEventUpdate):
+async def update_event(event_id: str, updates: TimelineEventUpdate, actor_id: Optional[str] = Depends(get_optional_user)):
     update_data = {k: v for k, v in updates.model_dump().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No updates provided")
     
-    result = supabase.table("timeline_events").update(update_data).eq("id", event_id).execute()
-    if not result.data:
+    row = await apply_update("timeline_events", event_id, update_data, actor_id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Event not found")
-    return result.data[0]
+    index_event(row)
+    return row
 
 
 @app.delete("/api/events/{event_id}")
-async def delete_event(event_id: str):
-    supabase.table("timeline_events").delete().eq("id", event_id).execute()
+async def delete_event(event_id: str, actor_id: Optional[str] = Depends(get_optional_user)):
+    for event in await apply_delete("timeline_events", event_id, actor_id):
+        index_event(event, removed=True)
     return {"success": True}
 
 
 # Task Routes
 @app.get("/api/weddings/{wedding_id}/tasks")
 async def get_tasks(wedding_id: str):
-    result = supabase.table("tasks").select("*").eq("wedding_id", wedding_id).execute()
-    return result.data
+    result = db.table("tasks").select("*").eq("wedding_id", wedding_id).execute()
+    return write_behind.overlay("tasks", result.data)
 
 
 @app.post("/api/weddings/{wedding_id}/tasks")
@@ -571,33 +763,56 @@ async def create_task(wedding_id: str, task: TaskCreate):
         "wedding_id": wedding_id,
         **task.model_dump(),
     }
-    result = supabase.table("tasks").insert(new_task).execute()
+    result = db.table("tasks").insert(new_task).execute()
+    index_task(result.data[0])
+    invalidate_wedding_portfolio(wedding_id)
     return result.data[0]
 
 
 @app.patch("/api/tasks/{task_id}")
-async def update_task(task_id: str, updates: TaskUpdate):
+async def update_task(task_id: str, updates: TaskUpdate, actor_id: Optional[str] = Depends(get_optional_user)):
     update_data = {k: v for k, v in updates.model_dump().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No updates provided")
     
-    result = supabase.table("tasks").update(update_data).eq("id", task_id).execute()
-    if not result.data:
+    row = await apply_update("tasks", task_id, update_data, actor_id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    return result.data[0]
+    index_task(row)
+    invalidate_wedding_portfolio(row["wedding_id"])
+    return row
 
 
 @app.delete("/api/tasks/{task_id}")
-async def delete_task(task_id: str):
-    supabase.table("tasks").delete().eq("id", task_id).execute()
+async def delete_task(task_id: str, actor_id: Optional[str] = Depends(get_optional_user)):
+    for task in await apply_delete("tasks", task_id, actor_id):
+        index_task(task, removed=True)
+        invalidate_wedding_portfolio(task["wedding_id"])
     return {"success": True}
 
 
+# Schedule Routes
+@app.get("/api/weddings/{wedding_id}/schedule")
+async def get_schedule(wedding_id: str):
+    index = get_schedule_index(db, wedding_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Wedding not found")
+    return index.report()
+
+
 # Budget Routes
 @app.get("/api/weddings/{wedding_id}/budget")
 async def get_budget_items(wedding_id: str):
-    result = supabase.table("budget_items").select("*").eq("wedding_id", wedding_id).execute()
-    return result.data
+    result = db.table("budget_items").select("*").eq("wedding_id", wedding_id).execute()
+    return write_behind.overlay("budget_items", result.data)
+
+
+@app.get("/api/weddings/{wedding_id}/budget/analytics")
+async def get_budget_analytics_route(wedding_id: str):
+    analytics = get_budget_analytics(db, wedding_id, overlay=write_behind.overlay)
+    if analytics is None:
+        raise HTTPException(status_code=404, detail="Wedding not found")
+    return analytics
 
 
 @app.post("/api/weddings/{wedding_id}/budget")
@@ -608,32 +823,38 @@ async def create_budget_item(wedding_id: str, item: BudgetItemCreate):
         "wedding_id": wedding_id,
         **item.model_dump(),
     }
-    result = supabase.table("budget_items").insert(new_item).execute()
+    result = db.table("budget_items").insert(new_item).execute()
+    invalidate_budget_analytics(wedding_id)
+    invalidate_wedding_portfolio(wedding_id)
     return result.data[0]
 
 
 @app.patch("/api/budget/{item_id}")
-async def update_budget_item(item_id: str, updates: BudgetItemUpdate):
+async def update_budget_item(item_id: str, updates: BudgetItemUpdate, actor_id: Optional[str] = Depends(get_optional_user)):
     update_data = {k: v for k, v in updates.model_dump().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No updates provided")
     
-    result = supabase.table("budget_items").update(update_data).eq("id", item_id).execute()
-    if not result.data:
+    row = await apply_update("budget_items", item_id, update_data, actor_id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Budget item not found")
-    return result.data[0]
+    invalidate_budget_analytics(row["wedding_id"])
+    invalidate_wedding_portfolio(row["wedding_id"])
+    return row
 
 
 @app.delete("/api/budget/{item_id}")
-async def delete_budget_item(item_id: str):
-    supabase.table("budget_items").delete().eq("id", item_id).execute()
+async def delete_budget_item(item_id: str, actor_id: Optional[str] = Depends(get_optional_user)):
+    for item in await apply_delete("budget_items", item_id, actor_id):
+        invalidate_budget_analytics(item["wedding_id"])
+        invalidate_wedding_portfolio(item["wedding_id"])
     return {"success": True}
 
 
 # Team Routes
 @app.get("/api/weddings/{wedding_id}/team")
 async def get_team_members(wedding_id: str):
-    result = supabase.table("wedding_team_members").select("*").eq("wedding_id", wedding_id).execute()
+    result = db.table("wedding_team_members").select("*").eq("wedding_id", wedding_id).execute()
     return result.data
 
 
@@ -648,64 +869,147 @@ async def create_team_member(wedding_id: str, member: TeamMemberCreate):
         "email": member.email,
         "role": member.role,
     }
-    result = supabase.table("wedding_team_members").insert(new_member).execute()
+    result = db.table("wedding_team_members").insert(new_member).execute()
     return result.data[0]
 
 
 @app.patch("/api/team/{member_id}")
-async def update_team_member(member_id: str, updates: TeamMemberUpdate):
+async def update_team_member(member_id: str, updates: TeamMemberUpdate, actor_id: Optional[str] = Depends(get_optional_user)):
     update_data = {k: v for k, v in updates.model_dump().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No updates provided")
     
-    result = supabase.table("wedding_team_members").update(update_data).eq("id", member_id).execute()
-    if not result.data:
+    row = await apply_update("wedding_team_members", member_id, update_data, actor_id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Team member not found")
-    return result.data[0]
+    return row
 
 
 @app.delete("/api/team/{member_id}")
-async def delete_team_member(member_id: str):
-    supabase.table("wedding_team_members").delete().eq("id", member_id).execute()
+async def delete_team_member(member_id: str, actor_id: Optional[str] = Depends(get_optional_user)):
+    await apply_delete("wedding_team_members", member_id, actor_id)
     return {"success": True}
 
 
-# Dashboard Stats
-@app.get("/api/weddings/{wedding_id}/stats")
-async def get_wedding_stats(wedding_id: str):
-    guests = supabase.table("guests").select("rsvp_status, accompanying_count").eq("wedding_id", wedding_id).execute()
-    tasks = supabase.table("tasks").select("status").eq("wedding_id", wedding_id).execute()
-    budget = supabase.table("budget_items").select("planned, actual").eq("wedding_id", wedding_id).execute()
-    wedding = supabase.table("weddings").select("total_budget").eq("id", wedding_id).execute()
-    
-    guest_stats = {"total": 0, "going": 0, "not_going": 0, "maybe": 0, "pending": 0}
-    for g in guests.data:
-        count = 1 + (g.get("accompanying_count") or 0)
-        guest_stats["total"] += count
-        status = g["rsvp_status"]
-        if status == "going":
-            guest_stats["going"] += count
-        elif status == "not_going":
-            guest_stats["not_going"] += count
-        elif status == "maybe":
-            guest_stats["maybe"] += count
-        else:
-            guest_stats["pending"] += count
-    
-    task_stats = {"total": 0, "completed": 0, "overdue": 0}
-    for t in tasks.data:
-        task_stats["total"] += 1
-        if t["status"] == "done":
-            task_stats["completed"] += 1
-    
-    budget_stats = {
-        "total_budget": wedding.data[0]["total_budget"] if wedding.data else 0,
-        "total_spent": sum(b["actual"] for b in budget.data),
-        "total_planned": sum(b["planned"] for b in budget.data),
+# Audit History
+@app.get("/api/weddings/{wedding_id}/history")
+async def get_wedding_history(
+    wedding_id: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    table: Optional[str] = None,
+    row_id: Optional[str] = None,
+    user_id: str = Depends(get_current_user),
+):
+    # Entries carry guests' old and new contact details
+    get_accessible_wedding(wedding_id, user_id)
+    # Make entries still sitting in the buffer visible
+    await audit_log.flush()
+    query = db.table("audit_log").select("*").eq("wedding_id", wedding_id)
+    if table:
+        query = query.eq("table_name", table)
+    if row_id:
+        query = query.eq("row_id", row_id)
+    offset = (page - 1) * page_size
+    result = query.order("created_at", desc=True).range(offset, offset + page_size - 1).execute()
+    return {
+        "page": page,
+        "page_size": page_size,
+        "entries": [decode_changes(entry) for entry in result.data],
     }
-    
+
+
+# Notifications
+@app.post("/api/weddings/{wedding_id}/notifications", status_code=202)
+async def send_notifications(wedding_id: str, notification: NotificationCreate, user_id: str = Depends(get_current_user)):
+    get_accessible_wedding(wedding_id, user_id)
+    if notification.channel not in notifications.transports:
+        raise HTTPException(status_code=503, detail=f"Sending {notification.channel} isn't configured on this server")
+    filters = {
+        k: v for k, v in notification.model_dump(include={"side", "rsvp_status", "group"}).items() if v is not None
+    }
+    return notifications.submit(
+        wedding_id, notification.channel, notification.template, notification.subject, filters,
+        idempotency_key=notification.idempotency_key,
+    )
+
+
+@app.get("/api/notifications/{job_id}")
+async def get_notification_job(job_id: str, user_id: str = Depends(get_current_user)):
+    job = notifications.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Notification job not found")
+    try:
+        get_accessible_wedding(job["wedding_id"], user_id)
+    except HTTPException:
+        raise HTTPException(status_code=404, detail="Notification job not found")
+    return job
+
+
+# Offline Bundles
+@app.get("/api/weddings/{wedding_id}/bundle")
+async def export_wedding_bundle(wedding_id: str, user_id: str = Depends(get_current_user)):
+    get_accessible_wedding(wedding_id, user_id)
+    # Export what clients have been told was saved
+    await write_behind.flush(force=True)
+    return StreamingResponse(
+        export_bundle(db, wedding_id),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="wedding-{wedding_id}.v{BUNDLE_VERSION}.ndjson.gz"'},
+    )
+
+
+@app.post("/api/weddings/{wedding_id}/bundle/import")
+async def import_wedding_bundle(wedding_id: str, bundle: BundleImport, user_id: str = Depends(get_current_user)):
+    if bundle.version != BUNDLE_VERSION:
+        raise HTTPException(status_code=400, detail=f"Unsupported bundle version {bundle.version}")
+    wedding = get_accessible_wedding(wedding_id, user_id)
+
+    await write_behind.flush(force=True)
+    changes = [change.model_dump() for change in bundle.changes]
+    result = await run_in_threadpool(merge_import, db, wedding_id, changes)
+
+    for entry in result["applied"]:
+        table, row = entry["table"], entry["after"] or entry["before"]
+        write_behind.discard(table, row["id"])
+        if table == "timeline_events":
+            index_event(row, removed=entry["after"] is None)
+        elif table == "tasks":
+            index_task(row, removed=entry["after"] is None)
+        await audit_log.record(table, entry["action"], entry["before"], entry["after"], user_id)
+    if result["applied"]:
+        invalidate_budget_analytics(wedding_id)
+        invalidate_portfolio(wedding["owner_id"])
+
     return {
-        "guests": guest_stats,
-        "tasks": task_stats,
-        "budget": budget_stats,
+        "applied": [
+            {
+                "table": e["table"],
+                "id": (e["after"] or e["before"])["id"],
+                "action": e["action"],
+                "version": row_version(e["after"]) if e["after"] else None,
+            }
+            for e in result["applied"]
+        ],
+        "conflicts": result["conflicts"],
+        "failed": result["failed"],
     }
+
+
+# Dashboard Stats
+@app.get("/api/weddings/{wedding_id}/stats")
+async def get_wedding_stats(wedding_id: str):
+    guests = db.table("guests").select("id, rsvp_status, accompanying_count").eq("wedding_id", wedding_id).execute()
+    tasks = db.table("tasks").select("id, status, due_date").eq("wedding_id", wedding_id).execute()
+    budget = db.table("budget_items").select("id, planned, actual").eq("wedding_id", wedding_id).execute()
+    wedding = db.table("weddings").select("total_budget").eq("id", wedding_id).execute()
+    
+    return compute_wedding_stats(
+        wedding.data[0]["total_budget"] if wedding.data else 0,
+        write_behind.overlay("guests", guests.data),
+        write_behind.overlay("tasks", tasks.data),
+        write_behind.overlay("budget_items", budget.data),
+    )
+
+
+startup.mark_imported()
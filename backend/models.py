@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, Literal
 from datetime import datetime
 
+from .timeline import normalize_timestamp, normalize_date
+
 # Enums as Literals
 TeamRole = Literal["owner", "bride", "groom", "family_admin", "helper"]
 GuestSide = Literal["bride", "groom"]
@@ -117,6 +119,11 @@ class TimelineEventBase(BaseModel):
     location: str
     notes: Optional[str] = None
 
+    @field_validator("date_time", mode="before")
+    @classmethod
+    def normalize_date_time(cls, v):
+        return normalize_timestamp(v)
+
 
 class TimelineEventCreate(TimelineEventBase):
     pass
@@ -128,6 +135,11 @@ class TimelineEventUpdate(BaseModel):
     location: Optional[str] = None
     notes: Optional[str] = None
 
+    @field_validator("date_time", mode="before")
+    @classmethod
+    def normalize_date_time(cls, v):
+        return normalize_timestamp(v)
+
 
 class TimelineEvent(TimelineEventBase):
     id: str
@@ -143,6 +155,11 @@ class TaskBase(BaseModel):
     assignee_name: Optional[str] = None
     linked_event: Optional[str] = None
 
+    @field_validator("due_date", mode="before")
+    @classmethod
+    def normalize_due_date(cls, v):
+        return normalize_date(v)
+
 
 class TaskCreate(TaskBase):
     pass
@@ -156,6 +173,11 @@ class TaskUpdate(BaseModel):
     assignee_name: Optional[str] = None
     linked_event: Optional[str] = None
 
+    @field_validator("due_date", mode="before")
+    @classmethod
+    def normalize_due_date(cls, v):
+        return normalize_date(v)
+
 
 class Task(TaskBase):
     id: str
@@ -182,3 +204,31 @@ class BudgetItemUpdate(BaseModel):
 class BudgetItem(BudgetItemBase):
     id: str
     wedding_id: str
+
+
+# Notification Models
+class NotificationCreate(BaseModel):
+    channel: Literal["email", "sms"]
+    template: str = Field(min_length=1)
+    subject: Optional[str] = None
+    side: Optional[GuestSide] = None
+    rsvp_status: Optional[RsvpStatus] = None
+    group: Optional[str] = None
+    # Resubmitting with the same key within a day skips guests already sent to
+    idempotency_key: Optional[str] = Field(None, max_length=200)
+
+
+# Offline Bundle Models
+BundleTable = Literal["weddings", "wedding_team_members", "timeline_events", "tasks", "guests", "budget_items"]
+
+
+class BundleChange(BaseModel):
+    table: BundleTable
+    op: Literal["upsert", "delete"] = "upsert"
+    row: dict
+    base_version: Optional[str] = None
+
+
+class BundleImport(BaseModel):
+    version: int
+    changes: list[BundleChange] = Field(max_length=10000)
@@ -0,0 +1,309 @@
+import asyncio
+import hashlib
+import json
+import os
+import smtplib
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from email.message import EmailMessage
+from string import Template
+from typing import AsyncIterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+GUEST_CHUNK_SIZE = 500
+MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5  # seconds, doubled on each retry
+DEDUP_WINDOW = 24 * 60 * 60  # seconds an idempotency key is remembered for
+
+
+class Transport(ABC):
+    """Delivers one rendered message; raise to have it retried"""
+
+    @abstractmethod
+    async def send(self, message: dict):
+        ...
+
+    def session(self) -> "Transport":
+        """A sender for one worker. Transports with per-connection setup return
+        one that keeps its connection open across messages."""
+        return self
+
+    async def close(self):
+        pass
+
+
+class FileTransport(Transport):
+    """Appends messages to a JSON-lines outbox; a stand-in for tests and
+    local development, only used when NOTIFY_OUTBOX_PATH is set"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = asyncio.Lock()
+
+    async def send(self, message: dict):
+        line = json.dumps(message) + "\n"
+        async with self._lock:
+            await run_in_threadpool(self._append, line)
+
+    def _append(self, line: str):
+        with open(self.path, "a") as f:
+            f.write(line)
+
+
+class SMTPTransport(Transport):
+    def __init__(self, host: str, port: int, username: Optional[str], password: Optional[str], sender: str):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender
+
+    async def send(self, message: dict):
+        session = self.session()
+        try:
+            await session.send(message)
+        finally:
+            await session.close()
+
+    def session(self) -> "SMTPSession":
+        return SMTPSession(self)
+
+
+class SMTPSession(Transport):
+    """One SMTP connection, opened on first use and reused for every message
+    a worker sends"""
+
+    def __init__(self, transport: SMTPTransport):
+        self.transport = transport
+        self.smtp: Optional[smtplib.SMTP] = None
+
+    async def send(self, message: dict):
+        await run_in_threadpool(self._send, message)
+
+    def _connect(self) -> smtplib.SMTP:
+        t = self.transport
+        smtp = smtplib.SMTP(t.host, t.port, timeout=10)
+        if t.username:
+            smtp.starttls()
+            smtp.login(t.username, t.password or "")
+        return smtp
+
+    def _send(self, message: dict):
+        email = EmailMessage()
+        email["From"] = self.transport.sender
+        email["To"] = message["to"]
+        email["Subject"] = message.get("subject") or ""
+        email.set_content(message["body"])
+        if self.smtp is None:
+            self.smtp = self._connect()
+        try:
+            self.smtp.send_message(email)
+        except (smtplib.SMTPServerDisconnected, OSError):
+            # Drop the broken connection; the retry reconnects
+            self._quit()
+            raise
+
+    def _quit(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.smtp = None
+
+    async def close(self):
+        await run_in_threadpool(self._quit)
+
+
+def transports_from_env() -> dict[str, Transport]:
+    """The configured channels. A channel with no provider is left out, unless
+    NOTIFY_OUTBOX_PATH is set, in which case its messages go to that file."""
+    transports: dict[str, Transport] = {}
+    if os.getenv("NOTIFY_OUTBOX_PATH"):
+        outbox = FileTransport(os.getenv("NOTIFY_OUTBOX_PATH"))
+        transports.update(email=outbox, sms=outbox)
+    if os.getenv("SMTP_HOST"):
+        transports["email"] = SMTPTransport(
+            os.getenv("SMTP_HOST"),
+            int(os.getenv("SMTP_PORT", "587")),
+            os.getenv("SMTP_USER"),
+            os.getenv("SMTP_PASSWORD"),
+            os.getenv("SMTP_FROM", "noreply@swiftshaadi.com"),
+        )
+    return transports
+
+
+async def stream_guests(client, wedding_id: str, filters: dict, chunk_size: int = GUEST_CHUNK_SIZE) -> AsyncIterator[list[dict]]:
+    """Yield a wedding's guests a chunk at a time using keyset pagination"""
+    last_id = None
+    while True:
+        def fetch():
+            query = client.table("guests").select("*").eq("wedding_id", wedding_id)
+            for column, value in filters.items():
+                query = query.eq(column, value)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            return query.order("id").limit(chunk_size).execute().data
+
+        chunk = await run_in_threadpool(fetch)
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1]["id"]
+
+
+class NotificationDispatcher:
+    """Fans templated messages out to a wedding's guests in the background.
+
+    A job never messages the same address twice. Across jobs, recipients are
+    only skipped when the caller resubmits with the same idempotency key
+    within DEDUP_WINDOW, so sending the same reminder again later works.
+    """
+
+    MAX_DEDUP_KEYS = 100000
+    MAX_FINISHED_JOBS = 100
+
+    def __init__(self, client, transports: dict[str, Transport], concurrency: int = 8):
+        self.client = client
+        self.transports = transports
+        self.concurrency = concurrency
+        self.jobs: dict[str, dict] = {}
+        # (idempotency key, recipient) -> when it was queued, oldest first
+        self.delivered: OrderedDict[str, float] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(self, wedding_id: str, channel: str, template: str, subject: Optional[str], filters: dict,
+               idempotency_key: Optional[str] = None) -> dict:
+        job = {
+            "id": str(uuid.uuid4()),
+            "wedding_id": wedding_id,
+            "channel": channel,
+            "status": "queued",
+            "total": 0,
+            "sent": 0,
+            "failed": 0,
+            "skipped": 0,
+            "duplicates": 0,
+            "errors": [],
+            "started_at": time.time(),
+            "finished_at": None,
+        }
+        self._prune_jobs()
+        self.jobs[job["id"]] = job
+        task = asyncio.create_task(self._run(job, template, subject, filters, idempotency_key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: dict, template: str, subject: Optional[str], filters: dict,
+                   idempotency_key: Optional[str] = None):
+        job["status"] = "running"
+        workers: list[asyncio.Task] = []
+        try:
+            wedding = await run_in_threadpool(
+                lambda: self.client.table("weddings").select("*").eq("id", job["wedding_id"]).execute().data
+            )
+            context = {k: v for k, v in (wedding[0] if wedding else {}).items() if isinstance(v, (str, int))}
+            body_template = Template(template)
+            subject_template = Template(subject or "")
+            campaign = hashlib.sha256(
+                f"{job['wedding_id']}|{job['channel']}|{idempotency_key}".encode()
+            ).hexdigest() if idempotency_key else None
+            recipients: set[str] = set()
+
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+            workers.extend(asyncio.create_task(self._worker(job, queue)) for _ in range(self.concurrency))
+            async for chunk in stream_guests(self.client, job["wedding_id"], filters):
+                for guest in chunk:
+                    job["total"] += 1
+                    address = guest.get("email") if job["channel"] == "email" else guest.get("phone")
+                    if not address:
+                        job["skipped"] += 1
+                        continue
+                    recipient = address.strip().lower()
+                    key = f"{campaign}|{recipient}" if campaign else None
+                    if recipient in recipients or (key and self._delivered_recently(key)):
+                        job["duplicates"] += 1
+                        continue
+                    recipients.add(recipient)
+                    if key:
+                        self._remember(key)
+                    values = {**context, **{k: v for k, v in guest.items() if v is not None}}
+                    await queue.put({
+                        "key": key,
+                        "channel": job["channel"],
+                        "to": address,
+                        "subject": subject_template.safe_substitute(values),
+                        "body": body_template.safe_substitute(values),
+                    })
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+            job["status"] = "completed"
+        except Exception as e:
+            print(f"[ERROR] notification job {job['id']}: {str(e)}")
+            job["status"] = "failed"
+            job["errors"].append(str(e))
+            if workers:
+                # Unqueue what wasn't sent so a later run can send it, then let
+                # the workers finish their current message and exit
+                while not queue.empty():
+                    message = queue.get_nowait()
+                    if message is not None and message["key"]:
+                        self.delivered.pop(message["key"], None)
+                for _ in workers:
+                    queue.put_nowait(None)
+                await asyncio.gather(*workers, return_exceptions=True)
+        job["finished_at"] = time.time()
+
+    async def _worker(self, job: dict, queue: asyncio.Queue):
+        sender = self.transports[job["channel"]].session()
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    return
+                await self._deliver(job, sender, message)
+        finally:
+            await sender.close()
+
+    async def _deliver(self, job: dict, sender: Transport, message: dict):
+        key = message.pop("key")
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                await sender.send(message)
+                job["sent"] += 1
+                return
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    job["failed"] += 1
+                    # Let a later run try this recipient again
+                    if key:
+                        self.delivered.pop(key, None)
+                    if len(job["errors"]) < 20:
+                        job["errors"].append(f"{message['to']}: {str(e)}")
+                else:
+                    await asyncio.sleep(RETRY_BASE_DELAY * 2 ** attempt)
+
+    def _prune_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["finished_at"] is not None]
+        for job_id in finished[:max(0, len(finished) - self.MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def _delivered_recently(self, key: str) -> bool:
+        queued_at = self.delivered.get(key)
+        return queued_at is not None and time.monotonic() - queued_at < DEDUP_WINDOW
+
+    def _remember(self, key: str):
+        now = time.monotonic()
+        self.delivered.pop(key, None)
+        self.delivered[key] = now
+        # Oldest first, so expired keys are always at the front
+        while self.delivered and (
+            len(self.delivered) > self.MAX_DEDUP_KEYS or now - next(iter(self.delivered.values())) >= DEDUP_WINDOW
+        ):
+            self.delivered.popitem(last=False)
@@ -0,0 +1,148 @@
+import time
+from collections import defaultdict
+from typing import Callable, Optional
+
+from .timeline import is_overdue
+
+PORTFOLIO_CACHE_TTL = 30  # seconds
+# PostgREST caps each response (1000 rows by default), so batched reads are
+# fetched in pages of this size
+FETCH_PAGE_SIZE = 1000
+
+
+def compute_wedding_stats(total_budget: int, guests: list[dict], tasks: list[dict], budget: list[dict]) -> dict:
+    guest_stats = {"total": 0, "going": 0, "not_going": 0, "maybe": 0, "pending": 0}
+    for g in guests:
+        count = 1 + (g.get("accompanying_count") or 0)
+        guest_stats["total"] += count
+        status = g["rsvp_status"]
+        if status == "going":
+            guest_stats["going"] += count
+        elif status == "not_going":
+            guest_stats["not_going"] += count
+        elif status == "maybe":
+            guest_stats["maybe"] += count
+        else:
+            guest_stats["pending"] += count
+
+    task_stats = {"total": 0, "completed": 0, "overdue": 0}
+    for t in tasks:
+        task_stats["total"] += 1
+        if t["status"] == "done":
+            task_stats["completed"] += 1
+        elif is_overdue(t):
+            task_stats["overdue"] += 1
+
+    budget_stats = {
+        "total_budget": total_budget or 0,
+        "total_spent": sum(b["actual"] for b in budget),
+        "total_planned": sum(b["planned"] for b in budget),
+    }
+
+    return {
+        "guests": guest_stats,
+        "tasks": task_stats,
+        "budget": budget_stats,
+    }
+
+
+def fetch_all(build_query) -> list[dict]:
+    """Run a select page by page; build_query must return a fresh builder"""
+    rows = []
+    start = 0
+    while True:
+        page = build_query().range(start, start + FETCH_PAGE_SIZE - 1).execute().data
+        rows.extend(page)
+        if len(page) < FETCH_PAGE_SIZE:
+            return rows
+        start += FETCH_PAGE_SIZE
+
+
+# owner_id -> {(page, page_size): (cached_at, result)}
+portfolio_cache: dict[str, dict[tuple[int, int], tuple[float, dict]]] = {}
+# wedding_id -> owner_id for the weddings on cached pages, so guest, task and
+# budget changes can find the portfolio they affect
+portfolio_wedding_owners: dict[str, str] = {}
+_last_eviction = 0.0
+
+
+def _evict_expired(now: float):
+    global _last_eviction
+    _last_eviction = now
+    for owner_id, pages in list(portfolio_cache.items()):
+        expired = [key for key, (cached_at, _) in pages.items() if now - cached_at >= PORTFOLIO_CACHE_TTL]
+        if len(expired) == len(pages):
+            invalidate_portfolio(owner_id)
+        else:
+            for key in expired:
+                del pages[key]
+
+
+def get_portfolio(client, owner_id: str, page: int, page_size: int,
+                  overlay: Optional[Callable[[str, list[dict]], list[dict]]] = None) -> dict:
+    """overlay applies edits acknowledged but not yet written (write-behind)"""
+    cached = portfolio_cache.get(owner_id, {}).get((page, page_size))
+    if cached and time.time() - cached[0] < PORTFOLIO_CACHE_TTL:
+        return cached[1]
+
+    offset = (page - 1) * page_size
+    weddings = (
+        client.table("weddings")
+        .select("*", count="exact")
+        .eq("owner_id", owner_id)
+        .order("date")
+        .range(offset, offset + page_size - 1)
+        .execute()
+    )
+    ids = [w["id"] for w in weddings.data]
+
+    guests_by_wedding = defaultdict(list)
+    tasks_by_wedding = defaultdict(list)
+    budget_by_wedding = defaultdict(list)
+    if ids:
+        for table, columns, by_wedding in (
+            ("guests", "id, wedding_id, rsvp_status, accompanying_count", guests_by_wedding),
+            ("tasks", "id, wedding_id, status, due_date", tasks_by_wedding),
+            ("budget_items", "id, wedding_id, planned, actual", budget_by_wedding),
+        ):
+            rows = fetch_all(lambda: client.table(table).select(columns).in_("wedding_id", ids).order("id"))
+            for row in overlay(table, rows) if overlay else rows:
+                by_wedding[row["wedding_id"]].append(row)
+
+    result = {
+        "page": page,
+        "page_size": page_size,
+        "total": weddings.count if weddings.count is not None else len(ids),
+        "weddings": [
+            {
+                **w,
+                "stats": compute_wedding_stats(
+                    w.get("total_budget"),
+                    guests_by_wedding[w["id"]],
+                    tasks_by_wedding[w["id"]],
+                    budget_by_wedding[w["id"]],
+                ),
+            }
+            for w in weddings.data
+        ],
+    }
+    now = time.time()
+    if now - _last_eviction > PORTFOLIO_CACHE_TTL:
+        _evict_expired(now)
+    portfolio_cache.setdefault(owner_id, {})[(page, page_size)] = (now, result)
+    for w in weddings.data:
+        portfolio_wedding_owners[w["id"]] = owner_id
+    return result
+
+
+def invalidate_portfolio(owner_id: str):
+    for _, result in portfolio_cache.pop(owner_id, {}).values():
+        for w in result["weddings"]:
+            portfolio_wedding_owners.pop(w["id"], None)
+
+
+def invalidate_wedding_portfolio(wedding_id: Optional[str]):
+    """Drop the cached portfolio containing this wedding, if any"""
+    owner_id = portfolio_wedding_owners.get(wedding_id)
+    if owner_id is not None:
+        invalidate_portfolio(owner_id)
@@ -0,0 +1,237 @@
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from http.cookies import SimpleCookie
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+
+class CounterStore(ABC):
+    """Token-bucket state keyed by client; swap in a shared store when
+    running several workers so they enforce one limit between them"""
+
+    # True if take() does I/O and has to run off the event loop
+    blocking = False
+
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Take one token. Returns 0 if allowed, else seconds until one frees up."""
+
+
+class MemoryCounterStore(CounterStore):
+    PRUNE_INTERVAL = 60  # seconds
+
+    def __init__(self):
+        # key -> (tokens, updated_at, time the bucket will be full again)
+        self.buckets: dict[str, tuple[float, float, float]] = {}
+        self._last_prune = time.monotonic()
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        tokens, updated, _ = self.buckets.get(key, (burst, now, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+        if not wait:
+            tokens -= 1
+        self.buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+        if now - self._last_prune > self.PRUNE_INTERVAL:
+            self._prune(now)
+        return wait
+
+    def _prune(self, now: float):
+        # A full bucket is the same as no bucket, so it can be forgotten
+        self._last_prune = now
+        full = [k for k, (_, _, full_at) in self.buckets.items() if full_at <= now]
+        for k in full:
+            del self.buckets[k]
+
+
+class SQLiteCounterStore(CounterStore):
+    """Buckets in a SQLite file shared by every worker on the host"""
+
+    blocking = True
+    PRUNE_INTERVAL = 60  # seconds
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=1)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, full_at REAL NOT NULL)"
+        )
+        # One transaction at a time on the shared connection
+        self._lock = threading.Lock()
+        self._last_prune = time.time()
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        with self._lock:
+            try:
+                return self._take(key, rate, burst)
+            except sqlite3.OperationalError as e:
+                # Fail open: a locked or unavailable store shouldn't take the API down
+                print(f"[WARNING] rate limit store: {str(e)}")
+                return 0.0
+
+    def _take(self, key: str, rate: float, burst: int) -> float:
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute("SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            self.conn.execute(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at, "
+                "full_at = excluded.full_at",
+                (key, tokens, now, now + (burst - tokens) / rate),
+            )
+            if now - self._last_prune > self.PRUNE_INTERVAL:
+                # As in MemoryCounterStore, full buckets can be forgotten
+                self._last_prune = now
+                self.conn.execute("DELETE FROM rate_limit_buckets WHERE full_at <= ?", (now,))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests; excess requests queue briefly, then are shed"""
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def acquire(self) -> bool:
+        if self.semaphore.locked() and self.waiting >= self.max_queue:
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        self.semaphore.release()
+
+
+# Login, signup and OAuth get a tighter per-IP budget than the rest of the API
+AUTH_PATHS = ("/api/auth/login", "/api/auth/signup", "/api/auth/google")
+EXEMPT_PATHS = ("/api/health",)
+
+
+def client_ip(scope, headers: Headers, trusted_hops: int = 1) -> str:
+    """The address the nearest untrusted hop connected from. Each trusted proxy
+    appends the address it saw to X-Forwarded-For, so anything further left
+    than `trusted_hops` entries from the right was written by the client."""
+    forwarded = headers.get("x-forwarded-for")
+    if forwarded and trusted_hops > 0:
+        entries = [e.strip() for e in forwarded.split(",") if e.strip()]
+        if entries:
+            return entries[max(0, len(entries) - trusted_hops)]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    def __init__(
+        self,
+        app,
+        store: Optional[CounterStore] = None,
+        rate: float = 10,
+        burst: int = 40,
+        auth_rate: float = 5 / 60,
+        auth_burst: int = 10,
+        max_concurrent: int = 32,
+        max_queue: int = 64,
+        queue_timeout: float = 10,
+        trusted_hops: int = 1,
+    ):
+        self.app = app
+        self.store = store or MemoryCounterStore()
+        self.rate = rate
+        self.burst = burst
+        self.auth_rate = auth_rate
+        self.auth_burst = auth_burst
+        self.limiter = ConcurrencyLimiter(max_concurrent, max_queue, queue_timeout)
+        self.trusted_hops = trusted_hops
+        self._warned_forwarded = False
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith("/api") or path.startswith(EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        ip = client_ip(scope, headers, self.trusted_hops)
+        if not self._warned_forwarded:
+            self._check_forwarded(headers)
+        if path.startswith(AUTH_PATHS):
+            checks = [(f"auth:{ip}", self.auth_rate, self.auth_burst)]
+        else:
+            checks = [(f"ip:{ip}", self.rate, self.burst * 2)]
+            session = SimpleCookie(headers.get("cookie", "")).get("session_id")
+            if session:
+                checks.append((f"session:{session.value}", self.rate, self.burst))
+
+        for key, rate, burst in checks:
+            if self.store.blocking:
+                wait = await run_in_threadpool(self.store.take, key, rate, burst)
+            else:
+                wait = self.store.take(key, rate, burst)
+            if wait:
+                response = JSONResponse(
+                    {"detail": "Too many requests"},
+                    status_code=429,
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+                await response(scope, receive, send)
+                return
+
+        if not await self.limiter.acquire():
+            response = JSONResponse(
+                {"detail": "Server busy, please retry"},
+                status_code=503,
+                headers={"Retry-After": str(math.ceil(self.limiter.queue_timeout))},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+    def _check_forwarded(self, headers: Headers):
+        """Warn once when requests arrive through more proxies than are trusted.
+        Behind an untrusted load balancer every client is limited as that
+        balancer's address and they all share one bucket."""
+        forwarded = headers.get("x-forwarded-for")
+        hops = len([e for e in forwarded.split(",") if e.strip()]) if forwarded else 0
+        if hops > self.trusted_hops:
+            self._warned_forwarded = True
+            print(
+                f"[WARNING] X-Forwarded-For has {hops} entries but TRUSTED_PROXY_HOPS is {self.trusted_hops}; "
+                "if every entry was added by your proxies, raise TRUSTED_PROXY_HOPS or all clients share one rate limit"
+            )
@@ -0,0 +1,293 @@
+import json
+import queue
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+SCHEMA_PATH = Path(__file__).with_name("sqlite_schema.sql")
+
+
+class APIResponse:
+    """Same shape as the postgrest response the Supabase client returns"""
+
+    def __init__(self, data: list[dict], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, path: str, size: int = 4, timeout: float = 5):
+        if path == ":memory:":
+            # A private shared-cache database so every pooled connection sees it
+            path = f"file:swift-shaadi-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        self.path = path
+        self.timeout = timeout
+        self._idle: queue.Queue[sqlite3.Connection] = queue.Queue()
+        self._all: list[sqlite3.Connection] = []
+        for _ in range(size):
+            conn = self._connect()
+            self._all.append(conn)
+            self._idle.put(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            uri=self.path.startswith("file:"),
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=5,
+            # Parameterized statements are compiled once per connection and reused
+            cached_statements=256,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        # Callers include async route handlers, so never wait indefinitely
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"No SQLite connection free after {self.timeout}s") from None
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        for conn in self._all:
+            conn.close()
+
+
+def _quote(name: str) -> str:
+    return '"' + name + '"'
+
+
+def _param(value):
+    # JSON columns are stored as text, like PostgREST accepts them for jsonb
+    return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+
+class QueryBuilder:
+    """The subset of the postgrest query builder the routes use"""
+
+    def __init__(self, client: "SQLiteClient", table: str):
+        if table not in client.columns:
+            raise ValueError(f"Unknown table: {table}")
+        self.client = client
+        self.table = table
+        self.op = "select"
+        self.columns = ["*"]
+        self.count: Optional[str] = None
+        self.payload = None
+        self.on_conflict = "id"
+        self.filters: list[tuple[str, list]] = []
+        self.order_by: list[str] = []
+        self.offset: Optional[int] = None
+        self.row_limit: Optional[int] = None
+
+    def _column(self, name: str) -> str:
+        if name not in self.client.columns[self.table]:
+            raise ValueError(f"Unknown column {self.table}.{name}")
+        return _quote(name)
+
+    def select(self, *columns: str, count: Optional[str] = None):
+        names = [c.strip() for col in columns for c in col.split(",") if c.strip()]
+        self.op = "select"
+        self.columns = names or ["*"]
+        self.count = count
+        return self
+
+    def insert(self, json, **kwargs):
+        self.op = "insert"
+        self.payload = json
+        return self
+
+    def upsert(self, json, on_conflict: str = "id", **kwargs):
+        self.op = "upsert"
+        self.payload = json
+        self.on_conflict = on_conflict or "id"
+        return self
+
+    def update(self, json, **kwargs):
+        self.op = "update"
+        self.payload = json
+        return self
+
+    def delete(self, **kwargs):
+        self.op = "delete"
+        return self
+
+    def _filter(self, column: str, op: str, value):
+        self.filters.append((f"{self._column(column)} {op} ?", [value]))
+        return self
+
+    def eq(self, column: str, value):
+        return self._filter(column, "=", value)
+
+    def neq(self, column: str, value):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column: str, value):
+        return self._filter(column, ">", value)
+
+    def gte(self, column: str, value):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column: str, value):
+        return self._filter(column, "<", value)
+
+    def lte(self, column: str, value):
+        return self._filter(column, "<=", value)
+
+    def in_(self, column: str, values):
+        values = list(values)
+        if not values:
+            self.filters.append(("0", []))
+        else:
+            self.filters.append((f"{self._column(column)} IN ({', '.join('?' * len(values))})", values))
+        return self
+
+    def is_(self, column: str, value):
+        if value in (None, "null"):
+            self.filters.append((f"{self._column(column)} IS NULL", []))
+            return self
+        return self.eq(column, value)
+
+    def order(self, column: str, desc: bool = False, **kwargs):
+        self.order_by.append(f"{self._column(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, size: int):
+        self.row_limit = size
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset = start
+        self.row_limit = end - start + 1
+        return self
+
+    def _where(self) -> tuple[str, list]:
+        if not self.filters:
+            return "", []
+        params = [p for _, ps in self.filters for p in ps]
+        return " WHERE " + " AND ".join(clause for clause, _ in self.filters), params
+
+    def _rows(self) -> list[dict]:
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        return [{"id": str(uuid.uuid4()), **row} if "id" not in row else row for row in rows]
+
+    def _insert_sql(self, names: list[str]) -> str:
+        cols = ", ".join(self._column(n) for n in names)
+        sql = f"INSERT INTO {_quote(self.table)} ({cols}) VALUES ({', '.join('?' * len(names))})"
+        if self.op == "upsert":
+            updates = ", ".join(f"{_quote(n)} = excluded.{_quote(n)}" for n in names if n != self.on_conflict)
+            sql += f" ON CONFLICT ({self._column(self.on_conflict)}) DO " + (f"UPDATE SET {updates}" if updates else "NOTHING")
+        return sql + " RETURNING *"
+
+    def execute(self) -> APIResponse:
+        where, params = self._where()
+        with self.client.pool.connection() as conn:
+            if self.op == "select":
+                cols = "*" if self.columns == ["*"] else ", ".join(self._column(c) for c in self.columns)
+                sql = f"SELECT {cols} FROM {_quote(self.table)}{where}"
+                if self.order_by:
+                    sql += " ORDER BY " + ", ".join(self.order_by)
+                if self.row_limit is not None:
+                    sql += f" LIMIT {int(self.row_limit)} OFFSET {int(self.offset or 0)}"
+                data = [dict(r) for r in conn.execute(sql, params)]
+                count = None
+                if self.count:
+                    count = conn.execute(f"SELECT COUNT(*) FROM {_quote(self.table)}{where}", params).fetchone()[0]
+                return APIResponse(data, count)
+
+            if self.op in ("insert", "upsert"):
+                rows = self._rows()
+                data = []
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for row in rows:
+                        data.extend(dict(r) for r in conn.execute(self._insert_sql(list(row)), [_param(v) for v in row.values()]))
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                return APIResponse(data)
+
+            if self.op == "update":
+                names = list(self.payload)
+                sets = ", ".join(f"{self._column(n)} = ?" for n in names)
+                sql = f"UPDATE {_quote(self.table)} SET {sets}{where} RETURNING *"
+                return APIResponse([dict(r) for r in conn.execute(sql, [_param(self.payload[n]) for n in names] + params)])
+
+            if self.op == "delete":
+                sql = f"DELETE FROM {_quote(self.table)}{where} RETURNING *"
+                return APIResponse([dict(r) for r in conn.execute(sql, params)])
+
+        raise ValueError(f"Unsupported operation: {self.op}")
+
+
+class RPCCall:
+    """The database functions from the Supabase schema the API calls via rpc()"""
+
+    def __init__(self, client: "SQLiteClient", name: str, params: dict):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self) -> APIResponse:
+        if self.name == "update_returning_old":
+            return APIResponse(self._update_returning_old(**self.params))
+        raise ValueError(f"Unknown function: {self.name}")
+
+    def _update_returning_old(self, tbl: str, row_id: str, changes: dict) -> Optional[dict]:
+        builder = QueryBuilder(self.client, tbl)
+        names = list(changes)
+        sets = ", ".join(f"{builder._column(n)} = ?" for n in names)
+        with self.client.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = conn.execute(f"SELECT * FROM {_quote(tbl)} WHERE id = ?", (row_id,)).fetchone()
+                after = None
+                if before is not None:
+                    after = conn.execute(
+                        f"UPDATE {_quote(tbl)} SET {sets} WHERE id = ? RETURNING *",
+                        [_param(changes[n]) for n in names] + [row_id],
+                    ).fetchone()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return {"before": dict(before), "after": dict(after)} if before is not None else None
+
+
+class SQLiteClient:
+    """Embedded storage engine exposing the Supabase client's table() API"""
+
+    def __init__(self, path: str = "swift_shaadi.db", pool_size: int = 4):
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA_PATH.read_text())
+            tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            self.columns = {
+                t: {r[1] for r in conn.execute(f"PRAGMA table_info({_quote(t)})")}
+                for t in tables
+            }
+
+    def table(self, name: str) -> QueryBuilder:
+        return QueryBuilder(self, name)
+
+    def rpc(self, name: str, params: dict) -> RPCCall:
+        return RPCCall(self, name, params)
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,98 @@
+-- Swift Shaadi schema for the embedded SQLite backend
+-- Same tables as supabase_schema.sql; applied automatically when the database opens
+
+CREATE TABLE IF NOT EXISTS users (
+  id TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  email TEXT NOT NULL UNIQUE,
+  password TEXT NOT NULL,
+  google_id TEXT,
+  created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS weddings (
+  id TEXT PRIMARY KEY,
+  couple_names TEXT NOT NULL,
+  date TEXT NOT NULL,
+  city TEXT NOT NULL,
+  haldi_date_time TEXT,
+  sangeet_date_time TEXT,
+  wedding_date_time TEXT,
+  total_budget INTEGER DEFAULT 0,
+  owner_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS wedding_team_members (
+  id TEXT PRIMARY KEY,
+  wedding_id TEXT NOT NULL REFERENCES weddings(id) ON DELETE CASCADE,
+  user_id TEXT REFERENCES users(id) ON DELETE SET NULL,
+  role TEXT NOT NULL CHECK (role IN ('owner', 'bride', 'groom', 'family_admin', 'helper')),
+  name TEXT NOT NULL,
+  email TEXT NOT NULL,
+  created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS guests (
+  id TEXT PRIMARY KEY,
+  wedding_id TEXT NOT NULL REFERENCES weddings(id) ON DELETE CASCADE,
+  name TEXT NOT NULL,
+  accompanying_count INTEGER NOT NULL DEFAULT 0,
+  phone TEXT,
+  email TEXT,
+  side TEXT NOT NULL CHECK (side IN ('bride', 'groom')),
+  "group" TEXT,
+  rsvp_status TEXT NOT NULL DEFAULT 'invited' CHECK (rsvp_status IN ('invited', 'going', 'not_going', 'maybe')),
+  created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS timeline_events (
+  id TEXT PRIMARY KEY,
+  wedding_id TEXT NOT NULL REFERENCES weddings(id) ON DELETE CASCADE,
+  name TEXT NOT NULL,
+  date_time TEXT NOT NULL,
+  location TEXT NOT NULL,
+  notes TEXT,
+  created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+  id TEXT PRIMARY KEY,
+  wedding_id TEXT NOT NULL REFERENCES weddings(id) ON DELETE CASCADE,
+  title TEXT NOT NULL,
+  description TEXT,
+  due_date TEXT,
+  status TEXT NOT NULL DEFAULT 'todo' CHECK (status IN ('todo', 'in_progress', 'done')),
+  assignee_name TEXT,
+  linked_event TEXT,
+  created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS budget_items (
+  id TEXT PRIMARY KEY,
+  wedding_id TEXT NOT NULL REFERENCES weddings(id) ON DELETE CASCADE,
+  category TEXT NOT NULL,
+  planned INTEGER NOT NULL DEFAULT 0,
+  actual INTEGER NOT NULL DEFAULT 0,
+  created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS audit_log (
+  id TEXT PRIMARY KEY,
+  wedding_id TEXT NOT NULL,
+  table_name TEXT NOT NULL,
+  row_id TEXT NOT NULL,
+  action TEXT NOT NULL CHECK (action IN ('insert', 'update', 'delete')),
+  actor_id TEXT,
+  changes TEXT NOT NULL DEFAULT '{}',
+  created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_weddings_owner_id ON weddings(owner_id, date);
+CREATE INDEX IF NOT EXISTS idx_team_members_wedding_id ON wedding_team_members(wedding_id);
+CREATE INDEX IF NOT EXISTS idx_guests_wedding_id ON guests(wedding_id);
+CREATE INDEX IF NOT EXISTS idx_timeline_events_wedding_id ON timeline_events(wedding_id, date_time);
+CREATE INDEX IF NOT EXISTS idx_tasks_wedding_id ON tasks(wedding_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_wedding_due_date ON tasks(wedding_id, due_date);
+CREATE INDEX IF NOT EXISTS idx_budget_items_wedding_id ON budget_items(wedding_id);
+CREATE INDEX IF NOT EXISTS idx_audit_log_wedding_id ON audit_log(wedding_id, created_at DESC);
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+# Imported first by backend.main, so this is when the app started loading
+IMPORT_STARTED = time.perf_counter()
+
+# phase name -> seconds
+timings: dict[str, float] = {}
+
+readiness = {"ready": False, "error": None, "checked_at": 0.0}
+
+
+@contextmanager
+def phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(time.perf_counter() - started, 4)
+
+
+def mark_imported():
+    timings["import"] = round(time.perf_counter() - IMPORT_STARTED, 4)
+
+
+def report() -> dict:
+    return {"ready": readiness["ready"], "error": readiness["error"], "timings": timings}
+
+
+def import_profile(module: str = "backend.main", top: int = 25) -> list[tuple[int, int, str]]:
+    """Import the module in a fresh interpreter with -X importtime and return
+    the slowest imports as (cumulative_us, self_us, name)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+if __name__ == "__main__":
+    # python -m backend.startup [module]
+    profile = import_profile(*sys.argv[1:2])
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in profile:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
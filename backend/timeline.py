@@ -0,0 +1,208 @@
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+# Events only store a start time, so every event is treated as occupying this
+# much of the schedule when checking for overlaps.
+EVENT_DURATION = timedelta(hours=2)
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    """Parse an ISO-8601 date or datetime, keeping any offset it was sent with"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime(value.year, value.month, value.day)
+    else:
+        text = str(value).strip()
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        try:
+            dt = datetime.fromisoformat(text)
+        except ValueError:
+            raise ValueError(f"Invalid date/time: {value!r}")
+    return dt
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Parse an ISO-8601 date or datetime into an aware UTC datetime"""
+    dt = _parse_datetime(value)
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def parse_date(value) -> Optional[date]:
+    """The calendar date as the client wrote it; converting to UTC first would
+    move e.g. 01:00+05:30 back to the previous day"""
+    dt = _parse_datetime(value)
+    return dt.date() if dt else None
+
+
+def normalize_timestamp(value) -> Optional[str]:
+    dt = parse_timestamp(value)
+    return dt.isoformat() if dt else None
+
+
+def normalize_date(value) -> Optional[str]:
+    day = parse_date(value)
+    return day.isoformat() if day else None
+
+
+def task_deadline(task: dict) -> Optional[datetime]:
+    """A task is due by the end of its due date"""
+    try:
+        due = parse_date(task.get("due_date"))
+    except ValueError:
+        # Rows written before timestamps were normalized may hold free text
+        return None
+    if due is None:
+        return None
+    return datetime(due.year, due.month, due.day, tzinfo=timezone.utc) + timedelta(days=1)
+
+
+def is_overdue(task: dict, now: Optional[datetime] = None) -> bool:
+    if task.get("status") == "done":
+        return False
+    deadline = task_deadline(task)
+    return deadline is not None and deadline <= (now or datetime.now(timezone.utc))
+
+
+class ScheduleIndex:
+    """In-memory index of one wedding's events and tasks ordered by time"""
+
+    def __init__(self, events: list[dict], tasks: list[dict]):
+        self.events: dict[str, dict] = {}
+        self.tasks: dict[str, dict] = {}
+        self._starts: list[tuple[datetime, str]] = []
+        for event in events:
+            self.upsert_event(event)
+        for task in tasks:
+            self.upsert_task(task)
+
+    def upsert_event(self, event: dict):
+        self.remove_event(event["id"])
+        try:
+            start = parse_timestamp(event.get("date_time"))
+        except ValueError:
+            return
+        if start is None:
+            return
+        self.events[event["id"]] = {**event, "_start": start}
+        insort(self._starts, (start, event["id"]))
+
+    def remove_event(self, event_id: str):
+        event = self.events.pop(event_id, None)
+        if event:
+            i = bisect_left(self._starts, (event["_start"], event_id))
+            del self._starts[i]
+
+    def upsert_task(self, task: dict):
+        self.tasks[task["id"]] = {**task, "_deadline": task_deadline(task)}
+
+    def remove_task(self, task_id: str):
+        self.tasks.pop(task_id, None)
+
+    def overlapping_pairs(self) -> list[tuple[str, str]]:
+        pairs = []
+        for i, (start, event_id) in enumerate(self._starts):
+            j = i + 1
+            while j < len(self._starts) and self._starts[j][0] < start + EVENT_DURATION:
+                pairs.append((event_id, self._starts[j][1]))
+                j += 1
+        return pairs
+
+    def find_event(self, ref: Optional[str]) -> Optional[dict]:
+        """Resolve a task's linked_event, which may hold an event id or name"""
+        if not ref:
+            return None
+        if ref in self.events:
+            return self.events[ref]
+        needle = ref.strip().lower()
+        for _, event_id in self._starts:
+            if self.events[event_id]["name"].strip().lower() == needle:
+                return self.events[event_id]
+        return None
+
+    def tasks_after_linked_event(self) -> list[dict]:
+        late = []
+        for task in self.tasks.values():
+            event = self.find_event(task.get("linked_event"))
+            if event and task["_deadline"] and task["_deadline"] > event["_start"] and task.get("status") != "done":
+                late.append({"task_id": task["id"], "event_id": event["id"]})
+        return late
+
+    def overdue_tasks(self, now: Optional[datetime] = None) -> list[str]:
+        now = now or datetime.now(timezone.utc)
+        return [
+            task["id"] for task in self.tasks.values()
+            if task.get("status") != "done" and task["_deadline"] and task["_deadline"] <= now
+        ]
+
+    def report(self, now: Optional[datetime] = None) -> dict:
+        now = now or datetime.now(timezone.utc)
+        return {
+            "events": [
+                {k: v for k, v in self.events[event_id].items() if not k.startswith("_")}
+                for _, event_id in self._starts
+            ],
+            "overlapping_events": [list(pair) for pair in self.overlapping_pairs()],
+            "tasks_due_after_event": self.tasks_after_linked_event(),
+            "overdue_tasks": self.overdue_tasks(now),
+        }
+
+
+# wedding_id -> (built_at, index), built lazily on first request and kept
+# current by the event and task routes; least recently used indexes are
+# dropped past SCHEDULE_CACHE_SIZE, and any index is rebuilt after the TTL
+SCHEDULE_CACHE_SIZE = 256
+SCHEDULE_CACHE_TTL = 300  # seconds
+schedule_indexes: OrderedDict[str, tuple[float, ScheduleIndex]] = OrderedDict()
+
+
+def get_schedule_index(client, wedding_id: str) -> Optional[ScheduleIndex]:
+    """The wedding's index, or None if the wedding doesn't exist"""
+    cached = schedule_indexes.get(wedding_id)
+    if cached and time.monotonic() - cached[0] < SCHEDULE_CACHE_TTL:
+        schedule_indexes.move_to_end(wedding_id)
+        return cached[1]
+    wedding = client.table("weddings").select("id").eq("id", wedding_id).execute()
+    if not wedding.data:
+        schedule_indexes.pop(wedding_id, None)
+        return None
+    events = client.table("timeline_events").select("*").eq("wedding_id", wedding_id).execute()
+    tasks = client.table("tasks").select("*").eq("wedding_id", wedding_id).execute()
+    index = ScheduleIndex(events.data, tasks.data)
+    schedule_indexes[wedding_id] = (time.monotonic(), index)
+    schedule_indexes.move_to_end(wedding_id)
+    while len(schedule_indexes) > SCHEDULE_CACHE_SIZE:
+        schedule_indexes.popitem(last=False)
+    return index
+
+
+def index_event(event: dict, removed: bool = False):
+    cached = schedule_indexes.get(event.get("wedding_id"))
+    if cached is None:
+        return
+    index = cached[1]
+    if removed:
+        index.remove_event(event["id"])
+    else:
+        index.upsert_event(event)
+
+
+def index_task(task: dict, removed: bool = False):
+    cached = schedule_indexes.get(task.get("wedding_id"))
+    if cached is None:
+        return
+    index = cached[1]
+    if removed:
+        index.remove_task(task["id"])
+    else:
+        index.upsert_task(task)
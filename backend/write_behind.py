@@ -0,0 +1,175 @@
+import asyncio
+import time
+from typing import Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+
+class WriteBehindBuffer:
+    """Coalesces rapid PATCHes to the same row into a single database write.
+
+    The first update to a row is written straight through so the caller gets
+    the real row (or a 404). Updates that arrive within `window` seconds of
+    the previous one are merged into a pending entry and acknowledged from
+    memory; the entry is written once the row has been quiet for `window`
+    seconds, or after `max_delay` at most. Pending entries are flushed on
+    shutdown and kept for retry if a write fails.
+
+    This is best-effort: acknowledged updates live only in process memory
+    until flushed, so a crash or kill -9 loses up to `max_delay` seconds of
+    edits. Reads that bypass overlay() won't see them until then either.
+    """
+
+    def __init__(self, client, window: float, max_delay: Optional[float] = None):
+        self.client = client
+        self.window = window
+        self.max_delay = max_delay or window * 5
+        self.entries: dict[tuple[str, str], dict] = {}
+        self.inflight: set[tuple[str, str]] = set()
+        self.listeners: list[Callable[[str, dict], None]] = []
+        self.metrics = {"updates": 0, "writes": 0, "failed_writes": 0}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def _open_entry(self, table: str, row_id: str, now: float) -> Optional[dict]:
+        key = (table, row_id)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        # While a flush is writing this row, later updates must queue behind
+        # it rather than write through and be overwritten when it lands
+        if key not in self.inflight and not entry["updates"] and now - entry["last_at"] >= self.window:
+            return None
+        return entry
+
+    def merge(self, table: str, row_id: str, updates: dict) -> Optional[dict]:
+        """Fold updates into an open window and return the acknowledged row,
+        or None if the caller has to write through"""
+        if not self.enabled:
+            return None
+        self.metrics["updates"] += 1
+        now = time.monotonic()
+        entry = self._open_entry(table, row_id, now)
+        if entry is None:
+            self.metrics["writes"] += 1
+            return None
+        if not entry["updates"]:
+            entry["first_pending_at"] = now
+        entry["updates"].update(updates)
+        entry["row"].update(updates)
+        entry["last_at"] = now
+        return dict(entry["row"])
+
+    def peek(self, table: str, row_id: str) -> Optional[dict]:
+        """The row as last acknowledged, while a coalescing window is open"""
+        if not self.enabled:
+            return None
+        entry = self._open_entry(table, row_id, time.monotonic())
+        return dict(entry["row"]) if entry else None
+
+    def track(self, table: str, row: dict):
+        """Open a coalescing window after a write-through"""
+        if self.enabled:
+            self.entries[(table, row["id"])] = {
+                "row": dict(row),
+                "updates": {},
+                "flushing": {},
+                "last_at": time.monotonic(),
+                "first_pending_at": None,
+            }
+
+    def discard(self, table: str, row_id: str):
+        self.entries.pop((table, row_id), None)
+
+    def overlay(self, table: str, rows: list[dict]) -> list[dict]:
+        """Apply pending updates to rows read from the database"""
+        if not self.entries:
+            return rows
+        for row in rows:
+            entry = self.entries.get((table, row.get("id")))
+            if entry:
+                row.update(entry["flushing"])
+                row.update(entry["updates"])
+        return rows
+
+    def stats(self) -> dict:
+        updates = self.metrics["updates"]
+        return {
+            "enabled": self.enabled,
+            "window_ms": int(self.window * 1000),
+            **self.metrics,
+            "pending": sum(1 for e in self.entries.values() if e["updates"]),
+            "writes_saved": updates - self.metrics["writes"],
+            "saved_ratio": round((updates - self.metrics["writes"]) / updates, 4) if updates else 0.0,
+        }
+
+    def _due(self, force: bool) -> list[tuple[str, str]]:
+        now = time.monotonic()
+        due = []
+        for key, entry in list(self.entries.items()):
+            if key in self.inflight:
+                continue
+            if not entry["updates"]:
+                if now - entry["last_at"] >= self.window:
+                    del self.entries[key]
+                continue
+            if force or now - entry["last_at"] >= self.window or now - entry["first_pending_at"] >= self.max_delay:
+                due.append(key)
+        return due
+
+    async def flush(self, force: bool = False):
+        for key in self._due(force):
+            entry = self.entries.get(key)
+            if entry is None or not entry["updates"]:
+                continue  # discarded while an earlier row was being written
+            table, row_id = key
+            updates, entry["updates"] = entry["updates"], {}
+            entry["flushing"] = updates
+            entry["first_pending_at"] = None
+            self.inflight.add(key)
+            try:
+                await run_in_threadpool(
+                    lambda: self.client.table(table).update(updates).eq("id", row_id).execute()
+                )
+            except Exception as e:
+                print(f"[ERROR] write_behind flush {table}/{row_id}: {str(e)}")
+                self.metrics["failed_writes"] += 1
+                # Retry underneath anything merged meanwhile, unless the row was
+                # discarded (deleted) in the meantime
+                if self.entries.get(key) is entry:
+                    entry["updates"] = {**updates, **entry["updates"]}
+                    entry["first_pending_at"] = entry["first_pending_at"] or time.monotonic()
+                continue
+            finally:
+                entry["flushing"] = {}
+                self.inflight.discard(key)
+            self.metrics["writes"] += 1
+            for listener in self.listeners:
+                listener(table, entry["row"])
+
+    async def _run(self):
+        while not self._stopping:
+            await asyncio.sleep(self.window / 2)
+            await self.flush()
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Let an in-progress flush finish rather than cancelling it midway
+            self._stopping = True
+            await self._task
+            self._task = None
+        while any(e["updates"] for e in self.entries.values()):
+            before = self.metrics["failed_writes"]
+            await self.flush(force=True)
+            if self.metrics["failed_writes"] != before:
+                print(f"[WARNING] write_behind: dropping {len(self.entries)} unflushed rows on shutdown")
+                break
@@ -53,6 +53,7 @@ export function log(message: string, source = "express") {
   const apiProxy = createProxyMiddleware({
     target: "http://localhost:8000/api",
     changeOrigin: false, // Preserve original host header
+    xfwd: true, // Pass the client IP through for per-IP rate limiting
     on: {
       proxyReq: (proxyReq, req) => {
         // Forward original host for OAuth redirect URI construction
@@ -0,0 +1,44 @@
+-- Add the audit_log table for guest/budget/timeline change history, and the
+-- update function the API uses to capture before-images
+-- Run this in your Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS audit_log (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  wedding_id UUID NOT NULL,
+  table_name TEXT NOT NULL,
+  row_id UUID NOT NULL,
+  action TEXT NOT NULL CHECK (action IN ('insert', 'update', 'delete')),
+  actor_id UUID,
+  changes JSONB NOT NULL DEFAULT '{}'::jsonb,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE audit_log ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow all for audit_log" ON audit_log FOR ALL USING (true) WITH CHECK (true);
+
+CREATE INDEX IF NOT EXISTS idx_audit_log_wedding_id ON audit_log(wedding_id, created_at DESC);
+
+-- Update a row and return its old and new values in one round trip, so the
+-- audit log gets a before-image without a separate read
+CREATE OR REPLACE FUNCTION update_returning_old(tbl TEXT, row_id UUID, changes JSONB)
+RETURNS JSONB AS $$
+DECLARE
+  old_row JSONB;
+  new_row JSONB;
+  assignments TEXT;
+BEGIN
+  IF tbl NOT IN ('weddings', 'wedding_team_members', 'guests', 'timeline_events', 'tasks', 'budget_items') THEN
+    RAISE EXCEPTION 'update_returning_old: unsupported table %', tbl;
+  END IF;
+  EXECUTE format('SELECT to_jsonb(t) FROM %I t WHERE id = $1 FOR UPDATE', tbl) INTO old_row USING row_id;
+  IF old_row IS NULL THEN
+    RETURN NULL;
+  END IF;
+  SELECT string_agg(format('%I = r.%I', key, key), ', ') INTO assignments FROM jsonb_object_keys(changes) AS key;
+  EXECUTE format(
+    'UPDATE %I t SET %s FROM jsonb_populate_record(NULL::%I, $2) r WHERE t.id = $1 RETURNING to_jsonb(t)',
+    tbl, assignments, tbl
+  ) INTO new_row USING row_id, changes;
+  RETURN jsonb_build_object('before', old_row, 'after', new_row);
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,55 @@
+-- Convert free-form event and task dates to real timestamps
+-- Run this in your Supabase SQL Editor on databases created before this change
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION pg_temp.try_timestamptz(v TEXT) RETURNS TIMESTAMP WITH TIME ZONE AS $$
+BEGIN
+  RETURN NULLIF(v, '')::TIMESTAMP WITH TIME ZONE;
+EXCEPTION WHEN others THEN
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Due dates keep the calendar day the client wrote, ignoring any offset
+CREATE OR REPLACE FUNCTION pg_temp.try_date(v TEXT) RETURNS DATE AS $$
+BEGIN
+  RETURN NULLIF(v, '')::TIMESTAMP::DATE;
+EXCEPTION WHEN others THEN
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Nothing is converted while any value fails to parse. List the offending rows
+-- with the queries below, correct them, then run this script again:
+--   SELECT id, wedding_id, name, date_time FROM timeline_events
+--     WHERE NULLIF(date_time, '') IS NULL OR date_time !~ '^\d{4}-\d{2}-\d{2}';
+--   SELECT id, wedding_id, title, due_date FROM tasks
+--     WHERE NULLIF(due_date, '') IS NOT NULL AND due_date !~ '^\d{4}-\d{2}-\d{2}';
+DO $$
+DECLARE
+  bad_events INTEGER;
+  bad_tasks INTEGER;
+BEGIN
+  SELECT count(*) INTO bad_events FROM timeline_events WHERE pg_temp.try_timestamptz(date_time) IS NULL;
+  SELECT count(*) INTO bad_tasks FROM tasks
+    WHERE NULLIF(due_date, '') IS NOT NULL AND pg_temp.try_date(due_date) IS NULL;
+  IF bad_events > 0 OR bad_tasks > 0 THEN
+    RAISE EXCEPTION '% event date_time and % task due_date values are not valid dates; nothing was changed',
+      bad_events, bad_tasks
+      USING HINT = 'See the queries at the top of supabase_normalize_timestamps.sql to find them';
+  END IF;
+END $$;
+
+ALTER TABLE timeline_events
+  ALTER COLUMN date_time TYPE TIMESTAMP WITH TIME ZONE USING pg_temp.try_timestamptz(date_time);
+
+-- Only empty strings become NULL here; everything else parsed above
+ALTER TABLE tasks
+  ALTER COLUMN due_date TYPE DATE USING pg_temp.try_date(due_date);
+
+DROP INDEX IF EXISTS idx_timeline_events_wedding_id;
+CREATE INDEX IF NOT EXISTS idx_timeline_events_wedding_id ON timeline_events(wedding_id, date_time);
+CREATE INDEX IF NOT EXISTS idx_tasks_wedding_due_date ON tasks(wedding_id, due_date);
+
+COMMIT;
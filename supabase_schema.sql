@@ -55,7 +55,7 @@ CREATE TABLE IF NOT EXISTS timeline_events (
   id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
   wedding_id UUID NOT NULL REFERENCES weddings(id) ON DELETE CASCADE,
   name TEXT NOT NULL,
-  date_time TEXT NOT NULL,
+  date_time TIMESTAMP WITH TIME ZONE NOT NULL,
   location TEXT NOT NULL,
   notes TEXT,
   created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
@@ -67,7 +67,7 @@ CREATE TABLE IF NOT EXISTS tasks (
   wedding_id UUID NOT NULL REFERENCES weddings(id) ON DELETE CASCADE,
   title TEXT NOT NULL,
   description TEXT,
-  due_date TEXT,
+  due_date DATE,
   status TEXT NOT NULL DEFAULT 'todo' CHECK (status IN ('todo', 'in_progress', 'done')),
   assignee_name TEXT,
   linked_event TEXT,
@@ -84,6 +84,18 @@ CREATE TABLE IF NOT EXISTS budget_items (
   created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Audit Log table (no foreign keys so history outlives the rows it describes)
+CREATE TABLE IF NOT EXISTS audit_log (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  wedding_id UUID NOT NULL,
+  table_name TEXT NOT NULL,
+  row_id UUID NOT NULL,
+  action TEXT NOT NULL CHECK (action IN ('insert', 'update', 'delete')),
+  actor_id UUID,
+  changes JSONB NOT NULL DEFAULT '{}'::jsonb,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- Enable Row Level Security (optional but recommended)
 ALTER TABLE users ENABLE ROW LEVEL SECURITY;
 ALTER TABLE weddings ENABLE ROW LEVEL SECURITY;
@@ -92,6 +104,7 @@ ALTER TABLE guests ENABLE ROW LEVEL SECURITY;
 ALTER TABLE timeline_events ENABLE ROW LEVEL SECURITY;
 ALTER TABLE tasks ENABLE ROW LEVEL SECURITY;
 ALTER TABLE budget_items ENABLE ROW LEVEL SECURITY;
+ALTER TABLE audit_log ENABLE ROW LEVEL SECURITY;
 
 -- Create policies to allow all operations (for development - restrict in production)
 CREATE POLICY "Allow all for users" ON users FOR ALL USING (true) WITH CHECK (true);
@@ -101,11 +114,39 @@ CREATE POLICY "Allow all for guests" ON guests FOR ALL USING (true) WITH CHECK (
 CREATE POLICY "Allow all for timeline_events" ON timeline_events FOR ALL USING (true) WITH CHECK (true);
 CREATE POLICY "Allow all for tasks" ON tasks FOR ALL USING (true) WITH CHECK (true);
 CREATE POLICY "Allow all for budget_items" ON budget_items FOR ALL USING (true) WITH CHECK (true);
+CREATE POLICY "Allow all for audit_log" ON audit_log FOR ALL USING (true) WITH CHECK (true);
 
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_weddings_owner_id ON weddings(owner_id);
 CREATE INDEX IF NOT EXISTS idx_team_members_wedding_id ON wedding_team_members(wedding_id);
 CREATE INDEX IF NOT EXISTS idx_guests_wedding_id ON guests(wedding_id);
-CREATE INDEX IF NOT EXISTS idx_timeline_events_wedding_id ON timeline_events(wedding_id);
+CREATE INDEX IF NOT EXISTS idx_timeline_events_wedding_id ON timeline_events(wedding_id, date_time);
 CREATE INDEX IF NOT EXISTS idx_tasks_wedding_id ON tasks(wedding_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_wedding_due_date ON tasks(wedding_id, due_date);
 CREATE INDEX IF NOT EXISTS idx_budget_items_wedding_id ON budget_items(wedding_id);
+CREATE INDEX IF NOT EXISTS idx_audit_log_wedding_id ON audit_log(wedding_id, created_at DESC);
+
+-- Update a row and return its old and new values in one round trip, so the
+-- audit log gets a before-image without a separate read
+CREATE OR REPLACE FUNCTION update_returning_old(tbl TEXT, row_id UUID, changes JSONB)
+RETURNS JSONB AS $$
+DECLARE
+  old_row JSONB;
+  new_row JSONB;
+  assignments TEXT;
+BEGIN
+  IF tbl NOT IN ('weddings', 'wedding_team_members', 'guests', 'timeline_events', 'tasks', 'budget_items') THEN
+    RAISE EXCEPTION 'update_returning_old: unsupported table %', tbl;
+  END IF;
+  EXECUTE format('SELECT to_jsonb(t) FROM %I t WHERE id = $1 FOR UPDATE', tbl) INTO old_row USING row_id;
+  IF old_row IS NULL THEN
+    RETURN NULL;
+  END IF;
+  SELECT string_agg(format('%I = r.%I', key, key), ', ') INTO assignments FROM jsonb_object_keys(changes) AS key;
+  EXECUTE format(
+    'UPDATE %I t SET %s FROM jsonb_populate_record(NULL::%I, $2) r WHERE t.id = $1 RETURNING to_jsonb(t)',
+    tbl, assignments, tbl
+  ) INTO new_row USING row_id, changes;
+  RETURN jsonb_build_object('before', old_row, 'after', new_row);
+END;
+$$ LANGUAGE plpgsql;
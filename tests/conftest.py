@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+# backend.main reads its configuration at import time
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from backend.sqlite_engine import SQLiteClient  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    client = SQLiteClient(":memory:")
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def wedding(db):
+    db.table("users").insert({"id": "user-1", "name": "Owner", "email": "owner@example.com", "password": "x"}).execute()
+    return db.table("weddings").insert({
+        "id": "7d0c6c1e-2a5f-4b7e-9f40-000000000001",
+        "couple_names": "Asha & Rahul",
+        "date": "2030-02-02",
+        "city": "Jaipur",
+        "total_budget": 1000,
+        "owner_id": "user-1",
+    }).execute().data[0]
+
+
+@pytest.fixture
+def api(db, monkeypatch):
+    """The app on the test database, signed in as a new user"""
+    from fastapi.testclient import TestClient
+
+    from backend import database, main
+
+    monkeypatch.setattr(database, "_client", db)
+    with TestClient(main.app, base_url="https://testserver") as client:
+        client.post("/api/auth/signup", json={"name": "Owner", "email": "owner@example.com", "password": "secret"})
+        yield client
+
+
+def sign_in_as_new_user(client, email: str) -> str:
+    """Switch the client to a fresh account and return its session id"""
+    client.cookies.clear()
+    client.post("/api/auth/signup", json={"name": email.split("@")[0], "email": email, "password": "secret"})
+    return client.cookies.get("session_id")
@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from backend import audit
+from backend.audit import AuditLog, decode_changes, diff_rows, update_returning_old
+from tests.conftest import sign_in_as_new_user
+
+
+class FlakyClient:
+    """The SQLite client with audit_log inserts that can be made to fail"""
+
+    def __init__(self, db):
+        self.db = db
+        self.fail = False
+        self.batches = []
+
+    def table(self, name):
+        builder = self.db.table(name)
+        if name == "audit_log":
+            insert = builder.insert
+
+            def failing_insert(rows):
+                if self.fail:
+                    raise ConnectionError("database unavailable")
+                self.batches.append(len(rows))
+                return insert(rows)
+
+            builder.insert = failing_insert
+        return builder
+
+    def rpc(self, name, params):
+        return self.db.rpc(name, params)
+
+
+class MissingFunctionError(Exception):
+    code = "PGRST202"
+
+
+@pytest.fixture
+def guest(db, wedding):
+    return db.table("guests").insert({
+        "id": "g1", "wedding_id": wedding["id"], "name": "Meera", "side": "bride", "phone": "111",
+    }).execute().data[0]
+
+
+def logged(db):
+    return [decode_changes(e) for e in db.table("audit_log").select("*").order("created_at").execute().data]
+
+
+def test_diff_rows_ignores_keys_and_unchanged_fields():
+    assert diff_rows({"id": "g1", "name": "A", "phone": "1"}, {"id": "g1", "name": "A", "phone": "2"}) == {"phone": ["1", "2"]}
+    assert diff_rows(None, {"id": "g1", "wedding_id": "w1", "name": "A"}) == {"name": [None, "A"]}
+
+
+def test_update_returning_old_uses_the_database_function(db, guest):
+    before, after = update_returning_old(db, "guests", "g1", {"phone": "222"})
+    assert (before["phone"], after["phone"]) == ("111", "222")
+    assert update_returning_old(db, "guests", "missing", {"phone": "222"}) == (None, None)
+
+
+def test_update_returning_old_falls_back_without_the_function(db, guest, monkeypatch):
+    monkeypatch.setattr(audit, "_update_rpc_available", True)
+
+    class OldDatabase(FlakyClient):
+        def rpc(self, name, params):
+            raise MissingFunctionError()
+
+    before, after = update_returning_old(OldDatabase(db), "guests", "g1", {"phone": "333"})
+    assert (before["phone"], after["phone"]) == ("111", "333")
+    assert audit._update_rpc_available is False
+
+
+def test_entries_are_written_in_batches(db, guest):
+    client = FlakyClient(db)
+    log = AuditLog(client, batch_size=2)
+
+    async def scenario():
+        for phone in ("2", "3", "4"):
+            await log.record("guests", "update", guest, {**guest, "phone": phone}, "user-1")
+        # No-op updates aren't logged
+        await log.record("guests", "update", guest, dict(guest), "user-1")
+        assert logged(db) == []
+        await log.flush()
+
+    asyncio.run(scenario())
+    assert client.batches == [2, 1]
+    entries = logged(db)
+    assert [e["changes"]["phone"] for e in entries] == [["111", "2"], ["111", "3"], ["111", "4"]]
+    assert {(e["wedding_id"], e["row_id"], e["actor_id"]) for e in entries} == {(guest["wedding_id"], "g1", "user-1")}
+
+
+def test_failed_batch_is_kept_for_the_next_flush(db, guest):
+    client = FlakyClient(db)
+    log = AuditLog(client)
+
+    async def scenario():
+        await log.record("guests", "delete", guest, None)
+        client.fail = True
+        assert await log.flush() is False
+        client.fail = False
+        assert await log.flush() is True
+
+    asyncio.run(scenario())
+    assert log.metrics["failed_batches"] == 1
+    assert [e["action"] for e in logged(db)] == ["delete"]
+
+
+def test_full_buffer_flushes_then_drops_oldest_when_database_is_down(db, guest):
+    client = FlakyClient(db)
+    log = AuditLog(client, capacity=2)
+
+    async def scenario():
+        for phone in ("2", "3", "4"):
+            await log.record("guests", "update", guest, {**guest, "phone": phone})
+        assert len(log.buffer) == 1 and len(logged(db)) == 2
+
+        client.fail = True
+        for phone in ("5", "6"):
+            await log.record("guests", "update", guest, {**guest, "phone": phone})
+
+    asyncio.run(scenario())
+    assert log.metrics["dropped"] == 1
+    assert [e["changes"]["phone"][1] for e in log.buffer] == ["5", "6"]
+
+
+def test_stop_writes_what_is_still_buffered(db, guest):
+    log = AuditLog(db, flush_interval=60)
+
+    async def scenario():
+        log.start()
+        for phone in ("2", "3"):
+            await log.record("guests", "update", guest, {**guest, "phone": phone})
+        await log.stop()
+        # and can be started again on a new loop
+        log.start()
+        await log.stop()
+
+    asyncio.run(scenario())
+    asyncio.run(scenario())
+    assert len(logged(db)) == 4
+
+
+def test_history_is_limited_to_the_weddings_users(api):
+    wedding = api.post("/api/weddings", json={"couple_names": "A & B", "date": "2030-02-02", "city": "Jaipur"}).json()
+    guest = api.post(f"/api/weddings/{wedding['id']}/guests", json={"name": "Meera", "side": "bride", "phone": "111"}).json()
+    api.patch(f"/api/guests/{guest['id']}", json={"phone": "222"})
+    api.delete(f"/api/guests/{guest['id']}")
+    owner_session = api.cookies.get("session_id")
+
+    history = api.get(f"/api/weddings/{wedding['id']}/history").json()["entries"]
+    assert [e["action"] for e in history] == ["delete", "update"]
+    assert history[1]["changes"] == {"phone": ["111", "222"]}
+
+    sign_in_as_new_user(api, "stranger@example.com")
+    assert api.get(f"/api/weddings/{wedding['id']}/history").status_code == 404
+    api.cookies.clear()
+    assert api.get(f"/api/weddings/{wedding['id']}/history").status_code == 401
+    api.cookies.set("session_id", owner_session)
+    assert api.get(f"/api/weddings/{wedding['id']}/history").status_code == 200
@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from backend import budget
+from backend.budget import compute_budget_analytics, get_budget_analytics, invalidate_budget_analytics
+
+NOW = datetime(2030, 1, 11, tzinfo=timezone.utc)
+
+
+def item(category, planned, actual, created_at="2030-01-01T00:00:00+00:00"):
+    return {"category": category, "planned": planned, "actual": actual, "created_at": created_at}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    budget.budget_analytics_cache.clear()
+    yield
+    budget.budget_analytics_cache.clear()
+
+
+def test_rolls_up_totals_and_categories():
+    analytics = compute_budget_analytics([
+        item("Venue", 500, 600),
+        item("Catering", 300, 100),
+        item("Venue", 100, 0),
+        item("Decor", 50, 0),
+    ], 1000, now=NOW)
+    assert (analytics["total_planned"], analytics["total_spent"]) == (950, 700)
+    assert (analytics["remaining"], analytics["unallocated"], analytics["percent_used"]) == (300, 50, 70.0)
+    assert [c["category"] for c in analytics["by_category"]] == ["Venue", "Catering", "Decor"]
+    assert analytics["by_category"][0] == {
+        "category": "Venue", "items": 2, "planned": 600, "actual": 600,
+        "variance": 0, "variance_pct": 0.0, "over_budget": False,
+    }
+    assert analytics["by_category"][1]["variance_pct"] == -66.67
+    # Venue counts at its 600 actual, the others at plan
+    assert analytics["projection"]["committed"] == 1050
+    assert analytics["projection"]["projected_overrun"] == 50
+
+
+def test_projects_spend_until_the_wedding():
+    analytics = compute_budget_analytics([item("Venue", 1000, 500)], 1000, "2030-01-21", now=NOW)
+    # 500 over 10 days, with 10 days to go
+    assert analytics["projection"]["daily_burn"] == 50.0
+    assert analytics["projection"]["run_rate_spend"] == 1000
+
+
+def test_empty_budget():
+    analytics = compute_budget_analytics([], 0, now=NOW)
+    assert analytics["by_category"] == []
+    assert analytics["percent_used"] is None
+    assert analytics["projection"] == {"committed": 0, "daily_burn": None, "run_rate_spend": None, "projected_overrun": 0}
+
+
+def test_analytics_are_cached_until_invalidated(db, wedding):
+    db.table("budget_items").insert({"id": "b1", "wedding_id": wedding["id"], "category": "Venue", "planned": 400, "actual": 100}).execute()
+    assert get_budget_analytics(db, wedding["id"])["total_spent"] == 100
+
+    db.table("budget_items").update({"actual": 300}).eq("id", "b1").execute()
+    assert get_budget_analytics(db, wedding["id"])["total_spent"] == 100
+    invalidate_budget_analytics(wedding["id"])
+    assert get_budget_analytics(db, wedding["id"])["total_spent"] == 300
+    assert get_budget_analytics(db, "00000000-0000-0000-0000-000000000000") is None
+
+
+def test_analytics_expire_after_the_ttl(db, wedding, monkeypatch):
+    first = get_budget_analytics(db, wedding["id"])
+    assert get_budget_analytics(db, wedding["id"]) is first
+    monkeypatch.setattr(budget, "BUDGET_ANALYTICS_CACHE_TTL", 0)
+    assert get_budget_analytics(db, wedding["id"]) is not first
+
+
+def test_analytics_cache_drops_least_recently_used(db, wedding, monkeypatch):
+    monkeypatch.setattr(budget, "BUDGET_ANALYTICS_CACHE_SIZE", 1)
+    other = db.table("weddings").insert({**{k: v for k, v in wedding.items() if k != "id"},
+                                         "id": "7d0c6c1e-2a5f-4b7e-9f40-000000000002"}).execute().data[0]
+    get_budget_analytics(db, wedding["id"])
+    get_budget_analytics(db, other["id"])
+    assert list(budget.budget_analytics_cache) == [other["id"]]
@@ -0,0 +1,120 @@
+import gzip
+import json
+
+import pytest
+
+from backend.bundle import export_bundle, merge_import, row_version
+
+GUEST_ID = "0a9f3c52-61d4-4c1a-8d1e-000000000001"
+NEW_GUEST_ID = "0a9f3c52-61d4-4c1a-8d1e-000000000002"
+OTHER_WEDDING_ID = "7d0c6c1e-2a5f-4b7e-9f40-000000000002"
+
+
+@pytest.fixture
+def guest(db, wedding):
+    return db.table("guests").insert({
+        "id": GUEST_ID, "wedding_id": wedding["id"], "name": "Meera", "side": "bride",
+    }).execute().data[0]
+
+
+def current(db, row_id):
+    rows = db.table("guests").select("*").eq("id", row_id).execute().data
+    return rows[0] if rows else None
+
+
+def upsert(row, base_version=None):
+    return {"table": "guests", "op": "upsert", "row": row, "base_version": base_version}
+
+
+def reasons(result):
+    return [(c["id"], c["reason"]) for c in result["conflicts"]]
+
+
+def test_export_roundtrip(db, wedding, guest):
+    lines = [json.loads(line) for line in gzip.decompress(b"".join(export_bundle(db, wedding["id"]))).splitlines()]
+    assert lines[0]["wedding_id"] == wedding["id"]
+    assert lines[-1]["counts"]["guests"] == 1
+    header = lines.index({"table": "guests", "columns": [*guest, "_version"]})
+    exported = dict(zip(lines[header]["columns"], lines[header + 1]))
+    assert exported.pop("_version") == row_version(guest)
+    assert exported == guest
+
+
+def test_update_with_current_version_is_applied(db, wedding, guest):
+    result = merge_import(db, wedding["id"], [upsert({**guest, "rsvp_status": "going"}, row_version(guest))])
+    assert result["conflicts"] == [] and result["failed"] == []
+    assert [(a["action"], a["before"]["rsvp_status"]) for a in result["applied"]] == [("update", "invited")]
+    assert current(db, GUEST_ID)["rsvp_status"] == "going"
+
+
+def test_update_of_row_changed_online_is_a_conflict(db, wedding, guest):
+    stale = row_version(guest)
+    db.table("guests").update({"name": "Meera S"}).eq("id", GUEST_ID).execute()
+    result = merge_import(db, wedding["id"], [upsert({**guest, "rsvp_status": "not_going"}, stale)])
+    assert reasons(result) == [(GUEST_ID, "modified")]
+    assert result["conflicts"][0]["current"]["name"] == "Meera S"
+    assert current(db, GUEST_ID)["rsvp_status"] == "invited"
+
+
+def test_update_of_row_deleted_online_is_a_conflict(db, wedding, guest):
+    version = row_version(guest)
+    db.table("guests").delete().eq("id", GUEST_ID).execute()
+    result = merge_import(db, wedding["id"], [upsert(guest, version)])
+    assert reasons(result) == [(GUEST_ID, "deleted")]
+    assert current(db, GUEST_ID) is None
+
+
+def test_new_row_is_inserted_unless_its_id_exists(db, wedding, guest):
+    row = {"id": NEW_GUEST_ID, "name": "Kabir", "side": "groom"}
+    result = merge_import(db, wedding["id"], [upsert(row), upsert({**guest, "name": "Someone else"})])
+    assert reasons(result) == [(GUEST_ID, "exists")]
+    assert [a["action"] for a in result["applied"]] == ["insert"]
+    assert current(db, NEW_GUEST_ID)["wedding_id"] == wedding["id"]
+
+
+def test_replaying_an_import_is_a_no_op(db, wedding, guest):
+    changes = [upsert({**guest, "rsvp_status": "going"}, row_version(guest))]
+    merge_import(db, wedding["id"], changes)
+    result = merge_import(db, wedding["id"], changes)
+    assert result == {"applied": [], "conflicts": [], "failed": []}
+
+
+def test_invalid_ids_and_other_weddings_rows_are_rejected(db, wedding, guest):
+    db.table("weddings").insert({
+        "id": OTHER_WEDDING_ID, "couple_names": "A & B", "date": "2030-03-03", "city": "Pune",
+        "total_budget": 0, "owner_id": "user-1",
+    }).execute()
+    foreign = db.table("guests").insert({
+        "id": NEW_GUEST_ID, "wedding_id": OTHER_WEDDING_ID, "name": "Ravi", "side": "groom",
+    }).execute().data[0]
+    result = merge_import(db, wedding["id"], [
+        upsert({"id": "guest-1", "name": "Nope", "side": "bride"}),
+        upsert({**foreign, "name": "Taken over"}, row_version(foreign)),
+        upsert({"id": NEW_GUEST_ID.replace("2", "3"), "name": "No side"}),
+    ])
+    assert [c["reason"] for c in result["conflicts"]] == ["invalid"] * 3
+    assert result["applied"] == []
+    assert current(db, NEW_GUEST_ID)["name"] == "Ravi"
+
+
+@pytest.mark.parametrize("row_id", [[1], {"id": GUEST_ID}, 7, None])
+def test_non_string_ids_are_rejected(db, wedding, guest, row_id):
+    result = merge_import(db, wedding["id"], [
+        upsert({"id": row_id, "name": "Nope", "side": "bride"}),
+        {"table": "guests", "op": "delete", "row": {"id": row_id}, "base_version": row_version(guest)},
+    ])
+    assert [c["reason"] for c in result["conflicts"]] == ["invalid", "invalid"]
+    assert result["applied"] == []
+    assert current(db, GUEST_ID) is not None
+
+
+def test_delete_requires_the_current_version(db, wedding, guest):
+    result = merge_import(db, wedding["id"], [{"table": "guests", "op": "delete", "row": {"id": GUEST_ID}, "base_version": "stale"}])
+    assert reasons(result) == [(GUEST_ID, "modified")]
+    assert current(db, GUEST_ID) is not None
+
+    delete = {"table": "guests", "op": "delete", "row": {"id": GUEST_ID}, "base_version": row_version(guest)}
+    result = merge_import(db, wedding["id"], [delete])
+    assert [a["action"] for a in result["applied"]] == ["delete"]
+    assert current(db, GUEST_ID) is None
+    assert merge_import(db, wedding["id"], [delete]) == {"applied": [], "conflicts": [], "failed": []}
@@ -0,0 +1,98 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from backend import compression
+from backend.compression import PayloadMiddleware, choose_encoding, omit_empty, to_columnar
+
+GUESTS = [
+    {"id": f"g{i}", "name": f"Guest {i}", "phone": None, "rsvp_status": "invited", "accompanying_count": 0}
+    for i in range(50)
+]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(PayloadMiddleware, minimum_size=100)
+
+    @app.get("/guests")
+    def guests():
+        return GUESTS
+
+    @app.get("/stats")
+    def stats():
+        return {"guests": {"total": 0, "going": 0}, "budget": {"total_spent": 0, "note": None}}
+
+    @app.get("/text")
+    def text():
+        return PlainTextResponse("x" * 1000)
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("gzip", "gzip"),
+    ("*", "br"),
+    ("br;q=0, *;q=0.1", "gzip"),
+    ("identity", None),
+    ("gzip;q=0", None),
+    ("", None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("br") is None
+    assert choose_encoding("br, gzip") == "gzip"
+
+
+def test_omit_empty_strips_defaults_only_from_rows():
+    assert omit_empty(GUESTS[:1]) == [{"id": "g0", "name": "Guest 0"}]
+    stats = {"guests": {"total": 0, "going": 3}, "budget": {"total_spent": 0, "planned": 0, "note": None}}
+    assert omit_empty(stats) == {"guests": {"total": 0, "going": 3}, "budget": {"total_spent": 0, "planned": 0}}
+    assert omit_empty([1, None]) == [1, None]
+
+
+def test_to_columnar():
+    assert to_columnar([{"a": 1}, {"a": 2, "b": 3}]) == {"columns": ["a", "b"], "rows": [[1, None], [2, 3]]}
+    assert to_columnar({"a": 1}) == {"a": 1}
+
+
+def test_large_json_is_compressed(client):
+    response = client.get("/guests", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == GUESTS
+
+
+def test_small_and_non_json_responses_are_not_compressed(client):
+    response = client.get("/stats", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    response = client.get("/text", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.text == "x" * 1000
+
+
+def test_omit_and_columnar_query_options(client):
+    response = client.get("/guests?omit=empty&format=columnar", headers={"Accept-Encoding": "identity"})
+    assert response.json()["columns"] == ["id", "name"]
+    assert response.json()["rows"][0] == ["g0", "Guest 0"]
+    assert int(response.headers["content-length"]) == len(response.content)
+
+    assert client.get("/stats?omit=empty").json() == {"guests": {"total": 0, "going": 0}, "budget": {"total_spent": 0}}
+
+
+def test_offloaded_compression():
+    app = FastAPI()
+    app.add_middleware(PayloadMiddleware, minimum_size=100, offload_size=100)
+    app.get("/guests")(lambda: GUESTS)
+    with TestClient(app) as offloaded:
+        response = offloaded.get("/guests", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == GUESTS
@@ -0,0 +1,31 @@
+import time
+
+from backend import database, main, startup
+
+
+class UnreachableClient:
+    def table(self, name):
+        raise ConnectionError("database unreachable")
+
+
+def test_readiness_is_rechecked_after_it_goes_stale(api, db, monkeypatch):
+    assert api.get("/api/health/ready").status_code == 200
+
+    monkeypatch.setattr(database, "_client", UnreachableClient())
+    # Recent successful checks are trusted without querying
+    assert api.get("/api/health/ready").status_code == 200
+    startup.readiness["checked_at"] = time.monotonic() - main.READY_RECHECK_INTERVAL - 1
+    response = api.get("/api/health")
+    assert response.status_code == 503
+    assert response.json()["message"] == "database unreachable"
+
+    monkeypatch.setattr(database, "_client", db)
+    assert api.get("/api/health/ready").status_code == 503
+    startup.readiness["checked_at"] = time.monotonic() - main.READINESS_RECHECK_INTERVAL - 1
+    assert api.get("/api/health/ready").status_code == 200
+
+
+def test_liveness_never_touches_the_database(api, monkeypatch):
+    monkeypatch.setattr(database, "_client", UnreachableClient())
+    startup.readiness["checked_at"] = 0.0
+    assert api.get("/api/health/live").json() == {"status": "ok"}
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from backend import main, notifications
+from backend.notifications import FileTransport, NotificationDispatcher, SMTPTransport, Transport, transports_from_env
+
+
+class RecordingTransport(Transport):
+    def __init__(self, failures: int = 0):
+        self.sent = []
+        self.sessions = 0
+        self.failures = failures
+
+    async def send(self, message: dict):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("provider unavailable")
+        self.sent.append(message)
+
+    def session(self):
+        self.sessions += 1
+        return self
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(notifications, "RETRY_BASE_DELAY", 0)
+
+
+@pytest.fixture
+def guests(db, wedding):
+    rows = [
+        {"id": "g1", "name": "Meera", "email": "meera@example.com", "side": "bride"},
+        {"id": "g2", "name": "Kabir", "email": "kabir@example.com", "side": "groom"},
+        {"id": "g3", "name": "Meera's plus-one", "email": " MEERA@example.com", "side": "bride"},
+        {"id": "g4", "name": "No email", "side": "groom"},
+    ]
+    db.table("guests").insert([{**row, "wedding_id": wedding["id"]} for row in rows]).execute()
+    return rows
+
+
+def send(dispatcher, wedding_id, *jobs):
+    """Submit each job in turn, waiting for it to finish"""
+    async def scenario():
+        finished = []
+        for kwargs in jobs:
+            job = dispatcher.submit(wedding_id, "email", kwargs.pop("template", "Hi $name"), None, {}, **kwargs)
+            await asyncio.gather(*dispatcher._tasks)
+            finished.append(job)
+        return finished
+
+    return asyncio.run(scenario())
+
+
+def test_sends_once_per_address(db, wedding, guests):
+    transport = RecordingTransport()
+    dispatcher = NotificationDispatcher(db, {"email": transport}, concurrency=2)
+    [job] = send(dispatcher, wedding["id"], {"template": "Hi $name, see you in $city"})
+    assert (job["status"], job["total"], job["sent"], job["skipped"], job["duplicates"]) == ("completed", 4, 2, 1, 1)
+    assert sorted(m["body"] for m in transport.sent) == ["Hi Kabir, see you in Jaipur", "Hi Meera, see you in Jaipur"]
+    assert transport.sessions == 2
+
+
+def test_sending_again_later_is_not_deduplicated(db, wedding, guests):
+    transport = RecordingTransport()
+    dispatcher = NotificationDispatcher(db, {"email": transport})
+    first, second = send(dispatcher, wedding["id"], {}, {})
+    assert (first["sent"], second["sent"], second["duplicates"]) == (2, 2, 1)
+
+
+def test_same_idempotency_key_skips_guests_already_sent(db, wedding, guests, monkeypatch):
+    transport = RecordingTransport()
+    dispatcher = NotificationDispatcher(db, {"email": transport})
+    first, retry, other = send(
+        dispatcher, wedding["id"],
+        {"idempotency_key": "rsvp-1"}, {"idempotency_key": "rsvp-1"}, {"idempotency_key": "rsvp-2"},
+    )
+    assert (first["sent"], retry["sent"], retry["duplicates"], other["sent"]) == (2, 0, 3, 2)
+
+    monkeypatch.setattr(notifications, "DEDUP_WINDOW", 0)
+    [expired] = send(dispatcher, wedding["id"], {"idempotency_key": "rsvp-1"})
+    assert expired["sent"] == 2
+    assert len(dispatcher.delivered) == 0
+
+
+def test_failed_sends_are_retried_and_can_be_resent(db, wedding, guests):
+    transport = RecordingTransport(failures=1)
+    dispatcher = NotificationDispatcher(db, {"email": transport}, concurrency=1)
+    [job] = send(dispatcher, wedding["id"], {"idempotency_key": "k"})
+    assert (job["sent"], job["failed"]) == (2, 0)
+
+    transport.failures = notifications.MAX_ATTEMPTS
+    [job] = send(dispatcher, wedding["id"], {"idempotency_key": "k2"})
+    assert (job["sent"], job["failed"]) == (1, 1)
+    assert len(job["errors"]) == 1
+    [retry] = send(dispatcher, wedding["id"], {"idempotency_key": "k2"})
+    assert (retry["sent"], retry["duplicates"]) == (1, 2)
+
+
+def test_failed_guest_stream_releases_workers_and_unsent_guests(db, wedding, guests, monkeypatch):
+    real_stream = notifications.stream_guests
+
+    async def broken_stream(*args, **kwargs):
+        async for chunk in real_stream(*args, chunk_size=1):
+            yield chunk
+            raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(notifications, "stream_guests", broken_stream)
+    transport = RecordingTransport()
+    dispatcher = NotificationDispatcher(db, {"email": transport})
+    [job] = send(dispatcher, wedding["id"], {"idempotency_key": "k"})
+    assert job["status"] == "failed"
+    assert job["errors"] == ["database unavailable"]
+    assert job["finished_at"] is not None
+
+    monkeypatch.setattr(notifications, "stream_guests", real_stream)
+    [rerun] = send(dispatcher, wedding["id"], {"idempotency_key": "k"})
+    # Whether the first guest went out before the failure or was unqueued,
+    # every guest is sent exactly once across the two runs
+    assert sorted(m["to"] for m in transport.sent) == ["kabir@example.com", "meera@example.com"]
+    assert job["sent"] + rerun["sent"] == 2
+
+
+def test_transports_from_env(monkeypatch, tmp_path):
+    for name in ("NOTIFY_OUTBOX_PATH", "SMTP_HOST"):
+        monkeypatch.delenv(name, raising=False)
+    assert transports_from_env() == {}
+
+    monkeypatch.setenv("NOTIFY_OUTBOX_PATH", str(tmp_path / "outbox.jsonl"))
+    assert {k: type(v) for k, v in transports_from_env().items()} == {"email": FileTransport, "sms": FileTransport}
+
+    monkeypatch.delenv("NOTIFY_OUTBOX_PATH")
+    monkeypatch.setenv("SMTP_HOST", "smtp.example.com")
+    assert {k: type(v) for k, v in transports_from_env().items()} == {"email": SMTPTransport}
+
+
+def test_unconfigured_channel_is_rejected(api, monkeypatch):
+    wedding = api.post("/api/weddings", json={"couple_names": "A & B", "date": "2030-02-02", "city": "Jaipur"}).json()
+    monkeypatch.setattr(main.notifications, "transports", {"email": RecordingTransport()})
+    response = api.post(f"/api/weddings/{wedding['id']}/notifications", json={"channel": "sms", "template": "Hi"})
+    assert response.status_code == 503
+    response = api.post(f"/api/weddings/{wedding['id']}/notifications", json={"channel": "email", "template": "Hi"})
+    assert response.status_code == 202
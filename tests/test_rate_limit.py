@@ -0,0 +1,100 @@
+import sqlite3
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from backend.rate_limit import MemoryCounterStore, RateLimitMiddleware, SQLiteCounterStore, client_ip
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCounterStore()
+    return SQLiteCounterStore(str(tmp_path / "buckets.db"))
+
+
+def test_bucket_allows_burst_then_asks_to_wait(store):
+    assert [store.take("ip:1", rate=1, burst=3) for _ in range(3)] == [0, 0, 0]
+    wait = store.take("ip:1", rate=1, burst=3)
+    assert 0 < wait <= 1
+    # Other keys have their own bucket
+    assert store.take("ip:2", rate=1, burst=3) == 0
+
+
+def test_bucket_refills_over_time(store, monkeypatch):
+    import backend.rate_limit as rate_limit
+
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now[0])
+    for _ in range(2):
+        store.take("k", rate=2, burst=2)
+    assert store.take("k", rate=2, burst=2) > 0
+    now[0] += 0.5
+    assert store.take("k", rate=2, burst=2) == 0
+
+
+def test_sqlite_store_prunes_full_buckets(tmp_path):
+    store = SQLiteCounterStore(str(tmp_path / "buckets.db"))
+    store.take("stale", rate=1000, burst=1)
+    time.sleep(0.01)  # refilled by now
+    store._last_prune = 0
+    store.take("fresh", rate=1, burst=5)
+    keys = [r[0] for r in store.conn.execute("SELECT key FROM rate_limit_buckets")]
+    assert keys == ["fresh"]
+
+
+def test_sqlite_store_fails_open_when_locked(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    store = SQLiteCounterStore(path)
+    store.conn.execute("PRAGMA busy_timeout = 10")
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        assert store.take("k", rate=1, burst=1) == 0
+    finally:
+        other.execute("ROLLBACK")
+
+
+@pytest.mark.parametrize("header,hops,expected", [
+    (None, 1, "203.0.113.9"),
+    ("198.51.100.7", 1, "198.51.100.7"),
+    # Entries left of the trusted hops were written by the client
+    ("10.0.0.1, 198.51.100.7", 1, "198.51.100.7"),
+    ("10.0.0.1, 198.51.100.7, 172.16.0.2", 2, "198.51.100.7"),
+    ("198.51.100.7", 3, "198.51.100.7"),
+    ("10.0.0.1, 198.51.100.7", 0, "203.0.113.9"),
+])
+def test_client_ip_uses_trusted_hops(header, hops, expected):
+    raw = [(b"x-forwarded-for", header.encode())] if header else []
+    scope = {"type": "http", "headers": raw, "client": ("203.0.113.9", 1234)}
+    assert client_ip(scope, Headers(scope=scope), hops) == expected
+
+
+def login_client(trusted_hops):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, auth_burst=2, trusted_hops=trusted_hops)
+    app.post("/api/auth/login")(lambda: {"ok": True})
+    return TestClient(app)
+
+
+def test_login_limit_is_per_client_behind_trusted_proxies():
+    client = login_client(trusted_hops=2)
+    for _ in range(2):
+        assert client.post("/api/auth/login", headers={"X-Forwarded-For": "203.0.113.1, 10.0.0.1"}).status_code == 200
+    assert client.post("/api/auth/login", headers={"X-Forwarded-For": "203.0.113.1, 10.0.0.1"}).status_code == 429
+    # A spoofed entry on the left doesn't buy a fresh bucket
+    assert client.post("/api/auth/login", headers={"X-Forwarded-For": "1.2.3.4, 203.0.113.1, 10.0.0.1"}).status_code == 429
+    assert client.post("/api/auth/login", headers={"X-Forwarded-For": "203.0.113.2, 10.0.0.1"}).status_code == 200
+
+
+def test_warns_once_when_more_proxies_than_trusted(capsys):
+    client = login_client(trusted_hops=1)
+    client.post("/api/auth/login", headers={"X-Forwarded-For": "203.0.113.1"})
+    assert "[WARNING]" not in capsys.readouterr().out
+    client.post("/api/auth/login", headers={"X-Forwarded-For": "203.0.113.1, 10.0.0.1"})
+    client.post("/api/auth/login", headers={"X-Forwarded-For": "203.0.113.2, 10.0.0.1"})
+    assert capsys.readouterr().out.count("TRUSTED_PROXY_HOPS is 1") == 1
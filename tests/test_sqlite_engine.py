@@ -0,0 +1,79 @@
+import pytest
+
+from backend.sqlite_engine import ConnectionPool, PoolTimeout
+
+
+def add_guests(db, wedding, count):
+    rows = [
+        {"id": f"g{i:02}", "wedding_id": wedding["id"], "name": f"Guest {i}", "side": "bride" if i % 2 else "groom"}
+        for i in range(count)
+    ]
+    return db.table("guests").insert(rows).execute().data
+
+
+def test_insert_applies_defaults_and_returns_rows(db, wedding):
+    rows = add_guests(db, wedding, 2)
+    assert [r["id"] for r in rows] == ["g00", "g01"]
+    assert rows[0]["rsvp_status"] == "invited"
+    assert rows[0]["accompanying_count"] == 0
+    assert rows[0]["created_at"]
+
+
+def test_select_filters_order_and_range(db, wedding):
+    add_guests(db, wedding, 10)
+    brides = db.table("guests").select("id").eq("side", "bride").order("id", desc=True).execute().data
+    assert [r["id"] for r in brides] == ["g09", "g07", "g05", "g03", "g01"]
+
+    page = db.table("guests").select("id", count="exact").eq("wedding_id", wedding["id"]).order("id").range(2, 4).execute()
+    assert [r["id"] for r in page.data] == ["g02", "g03", "g04"]
+    assert page.count == 10
+
+    assert len(db.table("guests").select("id").in_("id", ["g01", "g05", "missing"]).execute().data) == 2
+    assert len(db.table("guests").select("id").gt("id", "g07").execute().data) == 2
+    assert len(db.table("guests").select("id").is_("phone", "null").execute().data) == 10
+
+
+def test_update_and_delete_return_affected_rows(db, wedding):
+    add_guests(db, wedding, 3)
+    updated = db.table("guests").update({"rsvp_status": "going"}).eq("id", "g01").execute().data
+    assert updated[0]["rsvp_status"] == "going"
+    assert db.table("guests").update({"rsvp_status": "going"}).eq("id", "missing").execute().data == []
+
+    deleted = db.table("guests").delete().in_("id", ["g00", "g02"]).execute().data
+    assert {r["id"] for r in deleted} == {"g00", "g02"}
+    assert [r["id"] for r in db.table("guests").select("id").execute().data] == ["g01"]
+
+
+def test_upsert_inserts_and_updates(db, wedding):
+    add_guests(db, wedding, 1)
+    rows = db.table("guests").upsert([
+        {"id": "g00", "wedding_id": wedding["id"], "name": "Renamed", "side": "bride"},
+        {"id": "g01", "wedding_id": wedding["id"], "name": "New", "side": "groom"},
+    ]).execute().data
+    assert {r["id"]: r["name"] for r in rows} == {"g00": "Renamed", "g01": "New"}
+
+
+def test_unknown_columns_are_rejected(db, wedding):
+    with pytest.raises(ValueError):
+        db.table("guests").select("id").eq("nope; DROP TABLE guests", 1).execute()
+    with pytest.raises(ValueError):
+        db.table("guests").update({"nope": 1}).eq("id", "g00").execute()
+
+
+def test_update_returning_old(db, wedding):
+    add_guests(db, wedding, 1)
+    result = db.rpc("update_returning_old", {"tbl": "guests", "row_id": "g00", "changes": {"rsvp_status": "maybe"}}).execute().data
+    assert result["before"]["rsvp_status"] == "invited"
+    assert result["after"]["rsvp_status"] == "maybe"
+    assert db.rpc("update_returning_old", {"tbl": "guests", "row_id": "missing", "changes": {"name": "x"}}).execute().data is None
+
+
+def test_pool_times_out_when_exhausted():
+    pool = ConnectionPool(":memory:", size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            with pool.connection():
+                pass
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+    pool.close()
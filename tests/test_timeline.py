@@ -0,0 +1,111 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from backend import timeline
+from backend.timeline import ScheduleIndex, get_schedule_index, index_event, normalize_date, normalize_timestamp
+
+NOW = datetime(2030, 1, 10, 12, tzinfo=timezone.utc)
+
+
+def event(event_id, date_time, name=None):
+    return {"id": event_id, "wedding_id": "w1", "name": name or event_id, "date_time": date_time, "location": "Hall"}
+
+
+def task(task_id, due_date, status="todo", linked_event=None):
+    return {"id": task_id, "wedding_id": "w1", "title": task_id, "due_date": due_date, "status": status,
+            "linked_event": linked_event}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    timeline.schedule_indexes.clear()
+    yield
+    timeline.schedule_indexes.clear()
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2026-10-20", "2026-10-20"),
+    ("2026-10-20T01:00:00+05:30", "2026-10-20"),
+    ("2026-10-20T23:30:00-08:00", "2026-10-20"),
+    ("2026-10-20T23:30:00", "2026-10-20"),
+    ("", None),
+])
+def test_normalize_date_keeps_the_clients_calendar_day(value, expected):
+    assert normalize_date(value) == expected
+
+
+def test_normalize_timestamp_converts_to_utc():
+    assert normalize_timestamp("2026-10-20T01:00:00+05:30") == "2026-10-19T19:30:00+00:00"
+    assert normalize_timestamp("2026-10-20T01:00:00Z") == "2026-10-20T01:00:00+00:00"
+    with pytest.raises(ValueError):
+        normalize_timestamp("next tuesday")
+
+
+def test_events_within_two_hours_overlap():
+    index = ScheduleIndex([
+        event("mehendi", "2030-02-01T10:00:00+00:00"),
+        event("haldi", "2030-02-01T11:30:00+00:00"),
+        event("sangeet", "2030-02-01T13:00:00+00:00"),
+        # Starts exactly when sangeet's two hours end
+        event("baraat", "2030-02-01T15:00:00+00:00"),
+    ], [])
+    assert index.overlapping_pairs() == [("mehendi", "haldi"), ("haldi", "sangeet")]
+
+    index.upsert_event(event("haldi", "2030-02-01T20:00:00+00:00"))
+    assert index.overlapping_pairs() == []
+    index.remove_event("sangeet")
+    assert [e["id"] for e in index.report(NOW)["events"]] == ["mehendi", "baraat", "haldi"]
+
+
+def test_tasks_due_after_their_linked_event():
+    index = ScheduleIndex([event("e1", "2030-02-01T10:00:00+00:00", name="Sangeet")], [
+        task("by-id", "2030-02-01", linked_event="e1"),
+        task("by-name", "2030-02-05", linked_event=" sangeet "),
+        task("early", "2030-01-30", linked_event="e1"),
+        task("done", "2030-02-05", status="done", linked_event="e1"),
+        task("unknown", "2030-02-05", linked_event="Reception"),
+    ])
+    late = index.tasks_after_linked_event()
+    assert sorted(item["task_id"] for item in late) == ["by-id", "by-name"]
+    assert {item["event_id"] for item in late} == {"e1"}
+
+
+def test_tasks_are_overdue_after_the_end_of_their_due_date():
+    index = ScheduleIndex([], [
+        task("yesterday", "2030-01-09"),
+        task("today", "2030-01-10"),
+        task("finished", "2030-01-01", status="done"),
+        task("undated", None),
+        task("free-text", "sometime soon"),
+    ])
+    assert index.overdue_tasks(NOW) == ["yesterday"]
+    assert timeline.is_overdue(task("yesterday", "2030-01-09"), NOW)
+    assert not timeline.is_overdue(task("today", "2030-01-10"), NOW)
+
+
+def test_schedule_index_is_cached_and_kept_current(db, wedding):
+    assert get_schedule_index(db, "00000000-0000-0000-0000-000000000000") is None
+
+    db.table("timeline_events").insert({**event("e1", "2030-02-01T10:00:00+00:00"), "wedding_id": wedding["id"]}).execute()
+    index = get_schedule_index(db, wedding["id"])
+    assert list(index.events) == ["e1"]
+    assert get_schedule_index(db, wedding["id"]) is index
+
+    index_event({**event("e2", "2030-02-01T11:00:00+00:00"), "wedding_id": wedding["id"]})
+    assert index.overlapping_pairs() == [("e1", "e2")]
+
+
+def test_schedule_cache_drops_least_recently_used(db, wedding, monkeypatch):
+    monkeypatch.setattr(timeline, "SCHEDULE_CACHE_SIZE", 1)
+    get_schedule_index(db, wedding["id"])
+    other = db.table("weddings").insert({**{k: v for k, v in wedding.items() if k != "id"},
+                                         "id": "7d0c6c1e-2a5f-4b7e-9f40-000000000002"}).execute().data[0]
+    get_schedule_index(db, other["id"])
+    assert list(timeline.schedule_indexes) == [other["id"]]
+
+
+def test_schedule_index_is_rebuilt_after_the_ttl(db, wedding, monkeypatch):
+    first = get_schedule_index(db, wedding["id"])
+    monkeypatch.setattr(timeline, "SCHEDULE_CACHE_TTL", 0)
+    assert get_schedule_index(db, wedding["id"]) is not first
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.write_behind import WriteBehindBuffer
+
+
+class RecordingClient:
+    """Wraps the SQLite client, counting updates and optionally holding or
+    failing them"""
+
+    def __init__(self, db):
+        self.db = db
+        self.updates = []
+        self.fail = False
+        self.release = threading.Event()
+        self.release.set()
+
+    def table(self, name):
+        builder = self.db.table(name)
+        execute = builder.execute
+
+        def wrapped():
+            if builder.op == "update":
+                self.release.wait(5)
+                if self.fail:
+                    raise RuntimeError("database unavailable")
+                self.updates.append(dict(builder.payload))
+            return execute()
+
+        builder.execute = wrapped
+        return builder
+
+
+@pytest.fixture
+def task(db, wedding):
+    return db.table("tasks").insert({"id": "t1", "wedding_id": wedding["id"], "title": "Book venue"}).execute().data[0]
+
+
+def stored(db, row_id):
+    return db.table("tasks").select("*").eq("id", row_id).execute().data[0]
+
+
+def test_updates_within_window_coalesce_into_one_write(db, task):
+    client = RecordingClient(db)
+    buffer = WriteBehindBuffer(client, window=60)
+    buffer.track("tasks", task)
+    assert buffer.merge("tasks", "t1", {"status": "in_progress"})["status"] == "in_progress"
+    assert buffer.merge("tasks", "t1", {"status": "done", "title": "Venue booked"})["status"] == "done"
+    assert buffer.overlay("tasks", [dict(task)])[0]["status"] == "done"
+    assert stored(db, "t1")["status"] == "todo"
+
+    asyncio.run(buffer.flush(force=True))
+    assert client.updates == [{"status": "done", "title": "Venue booked"}]
+    assert stored(db, "t1")["status"] == "done"
+    assert buffer.stats()["writes_saved"] == 1
+
+
+def test_disabled_buffer_always_writes_through(db, task):
+    buffer = WriteBehindBuffer(db, window=0)
+    buffer.track("tasks", task)
+    assert buffer.merge("tasks", "t1", {"status": "done"}) is None
+    assert buffer.peek("tasks", "t1") is None
+
+
+def test_update_during_flush_is_written_after_it(db, task):
+    client = RecordingClient(db)
+    buffer = WriteBehindBuffer(client, window=60)
+    buffer.track("tasks", task)
+    buffer.merge("tasks", "t1", {"status": "done"})
+
+    async def scenario():
+        client.release.clear()
+        flush = asyncio.create_task(buffer.flush(force=True))
+        await asyncio.sleep(0.05)
+        # The older write is still in flight: this must queue, not write through
+        assert buffer.merge("tasks", "t1", {"status": "todo"})["status"] == "todo"
+        assert buffer.overlay("tasks", [{"id": "t1", "status": "?"}])[0]["status"] == "todo"
+        client.release.set()
+        await flush
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert client.updates == [{"status": "done"}, {"status": "todo"}]
+    assert stored(db, "t1")["status"] == "todo"
+
+
+def test_failed_write_is_retried_under_newer_updates(db, task):
+    client = RecordingClient(db)
+    buffer = WriteBehindBuffer(client, window=60)
+    buffer.track("tasks", task)
+    buffer.merge("tasks", "t1", {"status": "done", "title": "First"})
+
+    async def scenario():
+        client.release.clear()
+        client.fail = True
+        flush = asyncio.create_task(buffer.flush(force=True))
+        await asyncio.sleep(0.05)
+        buffer.merge("tasks", "t1", {"title": "Second"})
+        client.release.set()
+        await flush
+        client.fail = False
+        await buffer.flush(force=True)
+
+    asyncio.run(scenario())
+    assert buffer.metrics["failed_writes"] == 1
+    assert client.updates == [{"status": "done", "title": "Second"}]
+    row = stored(db, "t1")
+    assert (row["status"], row["title"]) == ("done", "Second")
+
+
+def test_discarded_row_is_not_requeued_after_failure(db, task):
+    client = RecordingClient(db)
+    buffer = WriteBehindBuffer(client, window=60)
+    buffer.track("tasks", task)
+    buffer.merge("tasks", "t1", {"status": "done"})
+
+    async def scenario():
+        client.release.clear()
+        client.fail = True
+        flush = asyncio.create_task(buffer.flush(force=True))
+        await asyncio.sleep(0.05)
+        buffer.discard("tasks", "t1")
+        client.release.set()
+        await flush
+
+    asyncio.run(scenario())
+    assert buffer.entries == {}